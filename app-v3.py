@@ -1,18 +1,88 @@
 # final edit 16/01/25 replace simple audio with pygame and add rain sound feature
-import tkinter as tk
-from ttkbootstrap import Style, ttk
-from tkinter import messagebox
-import threading
 import time
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from collections import deque
+_startup_started = time.perf_counter()
+
+import threading
+import math
+from array import array
+import bisect
 import datetime
+import heapq
+from collections import deque
+import select
 import json
+import mmap
 import os
-import chime
+import struct
 import sys
 import importlib
+import argparse
+import signal
+import shutil
+import subprocess
+import zlib
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class LazyModule:
+    """Module proxy that imports on first attribute access.
+
+    Its own names (_import, is_imported) are ones no proxied module defines,
+    so every other attribute, np.load included, reaches the real module.
+    """
+
+    load_times = {}  # Module name -> import seconds, reported by --profile-startup
+
+    def __init__(self, name, on_load=None):
+        self._name = name
+        self._on_load = on_load
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _import(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    if self._on_load:
+                        self._on_load(module)
+                    LazyModule.load_times[self._name] = time.perf_counter() - started
+                    self._module = module
+        return self._module
+
+    @property
+    def is_imported(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._import(), attr)
+
+
+# Heavy dependencies are only imported when first used; the daemon never loads Tk
+tk = LazyModule("tkinter")
+ttk = LazyModule("tkinter.ttk")  # Styled by ttkbootstrap once its Style is created
+messagebox = LazyModule("tkinter.messagebox")
+ttkbootstrap = LazyModule("ttkbootstrap")
+chime = LazyModule("chime", on_load=lambda module: module.theme("big-sur"))
+np = LazyModule("numpy")
+plt = LazyModule("matplotlib.pyplot")
+mpl_figure = LazyModule("matplotlib.figure")
+backend_tkagg = LazyModule("matplotlib.backends.backend_tkagg")
+pygame = LazyModule("pygame")
+urllib_request = LazyModule("urllib.request")  # HTTP hooks and read-only SQLite URIs
+# Standard modules that only some commands or settings need
+socket = LazyModule("socket")  # Control socket
+sqlite3 = LazyModule("sqlite3")  # "history_backend": "sqlite"
+tempfile = LazyModule("tempfile")
+tracemalloc = LazyModule("tracemalloc")  # soak
+wave = LazyModule("wave")  # soak
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # No banner on stdout when pygame loads
+_startup_imports_done = time.perf_counter()
 
 
 # Add error handling utility
@@ -24,31 +94,724 @@ def safe_operation(operation, error_message="Operation failed", default_return=N
         print(f"{error_message}: {str(e)}")
         return default_return
 
+class SystemClock:
+    """Real time source: monotonic for countdowns, wall clock for throttling, local date"""
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def time(self):
+        return time.time()
+
+    def today(self):
+        return datetime.date.today()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class VirtualClock(SystemClock):
+    """Clock that only moves when told to; sleeping advances it instantly"""
+
+    def __init__(self, start=None):
+        self._start = start or datetime.datetime.now()
+        self._elapsed = 0.0
+
+    def monotonic(self):
+        return self._elapsed
+
+    def time(self):
+        return self._start.timestamp() + self._elapsed
+
+    def now(self):
+        return self._start + datetime.timedelta(seconds=self._elapsed)
+
+    def today(self):
+        return self.now().date()
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        self._elapsed += max(0.0, seconds)
+
+    def advance_to(self, moment):
+        self.advance((moment - self.now()).total_seconds())
+
+
+class PersistenceWriter:
+    """Single background thread that performs all file writes off the Tk thread.
+
+    Pending operations are coalesced without reordering: a new full replacement
+    of a file takes over a replacement still queued as that file's latest
+    operation, keeping its place in the queue, and consecutive appends are
+    merged, so a slow disk only sees the newest content and writes to different
+    files still land in the order they were queued. A read_only writer drops
+    every operation, for processes that must not touch a directory another
+    instance owns.
+    """
+
+    def __init__(self, max_pending=32, read_only=False):
+        self.max_pending = max_pending
+        self.read_only = read_only
+        self._pending = []  # [path, kind, chunks] in submission order
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._has_work = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._busy = False
+        self._closed = False
+        self.writes = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.full_waits = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._total_latency = 0.0
+        self._thread = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+        self._thread.start()
+
+    def replace(self, path, content):
+        """Queue an atomic replacement of path; content may be a str or a callable returning one"""
+        self._submit(path, "replace", content)
+
+    def append(self, path, text):
+        self._submit(path, "append", text)
+
+    def patch(self, path, offset, data):
+        """Queue an in-place write of data at offset in an existing binary file"""
+        self._submit(path, "patch", (offset, data))
+
+    def call(self, path, function):
+        """Queue function to run on the writer thread, in order with other writes to path"""
+        self._submit(path, "call", function)
+
+    def _submit(self, path, kind, content):
+        if self.read_only:
+            return
+        with self._lock:
+            if kind == "replace":
+                latest = next((op for op in reversed(self._pending) if op[0] == path), None)
+                if latest is not None and latest[1] == "replace":
+                    latest[2] = [content]
+                    self.coalesced += 1
+                    return
+            elif self._pending and self._pending[-1][0] == path and self._pending[-1][1] == kind:
+                self._pending[-1][2].append(content)
+                self.coalesced += 1
+                return
+            while len(self._pending) >= self.max_pending and not self._closed:
+                self.full_waits += 1
+                self._not_full.wait()
+            self._pending.append([path, kind, [content]])
+            self._has_work.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._closed:
+                    self._idle.notify_all()
+                    self._has_work.wait()
+                if not self._pending:
+                    self._idle.notify_all()
+                    return
+                path, kind, chunks = self._pending.pop(0)
+                self._busy = True
+                self._not_full.notify()
+            started = time.perf_counter()
+            try:
+                if kind == "replace":
+                    content = chunks[-1]
+                    self._write_atomic(path, content() if callable(content) else content)
+                elif kind == "call":
+                    for function in chunks:
+                        try:
+                            function()
+                        except Exception as e:  # A failed call must not skip the ones merged after it
+                            self.errors += 1
+                            print(f"Error writing {path}: {e}")
+                elif kind == "patch":
+                    with open(path, "r+b") as f:
+                        for offset, data in chunks:
+                            f.seek(offset)
+                            f.write(data)
+                else:
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write("".join(chunks))
+            except Exception as e:
+                self.errors += 1
+                print(f"Error writing {path}: {e}")
+            latency = time.perf_counter() - started
+            with self._lock:
+                self._busy = False
+                self.writes += 1
+                self.last_latency = latency
+                self.max_latency = max(self.max_latency, latency)
+                self._total_latency += latency
+
+    @staticmethod
+    def _write_atomic(path, text):
+        """Write to a temp file next to path, fsync it, then rename over the original"""
+        tmp_path = f"{path}.tmp"
+        binary = isinstance(text, bytes)
+        with open(tmp_path, "wb" if binary else "w", encoding=None if binary else "utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def flush(self, timeout=5.0):
+        """Block until every queued write has hit the disk; returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._pending or self._busy:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout=5.0):
+        flushed = self.flush(timeout)
+        with self._lock:
+            self._closed = True
+            self._has_work.notify_all()
+            self._not_full.notify_all()
+        self._thread.join(timeout)
+        return flushed
+
+    def stats(self):
+        """Queue depth and write latency counters"""
+        with self._lock:
+            return {
+                "queue_depth": len(self._pending),
+                "writes": self.writes,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "full_waits": self.full_waits,
+                "last_latency_ms": self.last_latency * 1000,
+                "max_latency_ms": self.max_latency * 1000,
+                "avg_latency_ms": self._total_latency * 1000 / self.writes if self.writes else 0.0,
+            }
+
+
+class HistoryStore:
+    """Daily history as fixed-width binary records: date ordinal, count, seconds, goal.
+
+    Rows are kept sorted by date, so the ordinal column doubles as the date index:
+    lookups and range queries are a bisect, and today's row is patched in place.
+    With path=None the store lives in memory only and is never written.
+    """
+
+    MAGIC = b"PMHIST01"
+    RECORD = struct.Struct("<4I")
+    FIELDS = 4
+
+    def __init__(self, writer, path="pomodoro_history.bin"):
+        self.writer = writer
+        self.path = path
+        self._rows = array("I")  # Flat: ordinal, count, seconds, goal per row
+        self._ordinals = array("I")
+        self.exists = self._load()
+
+    def _load(self):
+        """Map the file and copy its records in one pass; no per-row parsing"""
+        if self.path is None:
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_size < len(self.MAGIC):
+                    return False
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if mm[:len(self.MAGIC)] != self.MAGIC:
+                        print("Unrecognized history file, starting empty")
+                        return False
+                    body = len(mm) - len(self.MAGIC)
+                    body -= body % self.RECORD.size  # Ignore a torn trailing record
+                    self._rows.frombytes(mm[len(self.MAGIC):len(self.MAGIC) + body])
+        except FileNotFoundError:
+            return False
+        if sys.byteorder == "big":
+            self._rows.byteswap()
+        self._ordinals = self._rows[0::self.FIELDS]
+        return True
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def __bool__(self):
+        return len(self._ordinals) > 0
+
+    def _row(self, index):
+        start = index * self.FIELDS
+        ordinal, count, seconds, goal = self._rows[start:start + self.FIELDS]
+        return (datetime.date.fromordinal(ordinal), count, seconds, goal)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return self._row(index)
+
+    def __iter__(self):
+        return (self._row(i) for i in range(len(self)))
+
+    def get(self, day):
+        """Row for day, or None"""
+        index = bisect.bisect_left(self._ordinals, day.toordinal())
+        if index < len(self) and self._ordinals[index] == day.toordinal():
+            return self._row(index)
+        return None
+
+    def between(self, start, end):
+        """Rows with start <= date <= end"""
+        lo = bisect.bisect_left(self._ordinals, start.toordinal())
+        hi = bisect.bisect_right(self._ordinals, end.toordinal())
+        return [self._row(i) for i in range(lo, hi)]
+
+    def raw_records(self):
+        """The flat record array (ordinal, count, seconds, goal per row), not copied"""
+        return self._rows
+
+    def last(self, n):
+        return [self._row(i) for i in range(max(0, len(self) - n), len(self))]
+
+    def upsert(self, day, count, seconds, goal, session=None):
+        """Insert or replace the row for day.
+
+        session is the (start, end, mode, interrupted) phase that produced the
+        change; stores with a session table record it with the row.
+        """
+        index, in_place = self._put(day, count, seconds, goal)
+        if in_place:
+            self._queue_record(index)
+        else:  # Back-dated row: rare, so rewrite the file
+            self.save()
+
+    def _put(self, day, count, seconds, goal):
+        """Update the in-memory rows; returns (index, False if later rows had to move)"""
+        ordinal = day.toordinal()
+        values = array("I", (ordinal, count, seconds, goal))
+        index = bisect.bisect_left(self._ordinals, ordinal)
+        start = index * self.FIELDS
+        if index < len(self) and self._ordinals[index] == ordinal:
+            self._rows[start:start + self.FIELDS] = values
+            return index, True
+        if index == len(self):
+            self._rows.extend(values)
+            self._ordinals.append(ordinal)
+            return index, True
+        self._rows[start:start] = values
+        self._ordinals.insert(index, ordinal)
+        return index, False
+
+    def add_session(self, day, session):
+        """Record a phase that did not change the daily totals; this store keeps totals only"""
+
+    def session_counts(self):
+        """Completed and interrupted phases per mode, or None if sessions are not kept"""
+        return None
+
+    def close(self):
+        """Release anything held open between writes; this store holds nothing"""
+
+    def replace_all(self, rows):
+        """Replace the whole store with (date, count, seconds, goal) rows and save it"""
+        by_ordinal = {d.toordinal(): (count, seconds, goal) for d, count, seconds, goal in rows}
+        self._rows = array("I")
+        for ordinal in sorted(by_ordinal):
+            self._rows.append(ordinal)
+            self._rows.extend(by_ordinal[ordinal])
+        self._ordinals = self._rows[0::self.FIELDS]
+        self.save()
+
+    def _queue_record(self, index):
+        if self.path is None:
+            return
+        if not self.exists:
+            self.save()
+            return
+        start = index * self.FIELDS
+        record = self.RECORD.pack(*self._rows[start:start + self.FIELDS])
+        self.writer.patch(self.path, len(self.MAGIC) + index * self.RECORD.size, record)
+
+    def save(self):
+        """Queue a full rewrite of the store"""
+        if self.path is None:
+            return
+        rows = array("I", self._rows)
+        if sys.byteorder == "big":
+            rows.byteswap()
+        self.writer.replace(self.path, self.MAGIC + rows.tobytes())
+        self.exists = True
+
+
+class SqliteHistoryStore(HistoryStore):
+    """History in a SQLite database: the daily rows plus one row per timer phase.
+
+    Reads are served from the same in-memory arrays as HistoryStore. Writes run
+    on the persistence writer's thread, each batch in one transaction, so a
+    finished pomodoro's session row and its daily rollup commit together. The
+    database is in WAL mode, so `stats` can read it while the timer writes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS daily (
+            day INTEGER PRIMARY KEY,  -- date ordinal; the primary key is the date index
+            count INTEGER NOT NULL,
+            seconds INTEGER NOT NULL,
+            goal INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY,
+            day INTEGER NOT NULL,
+            started REAL NOT NULL,
+            ended REAL NOT NULL,
+            mode TEXT NOT NULL,
+            interrupted INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sessions_day ON sessions (day);
+    """
+    # Constant statements with parameters, so sqlite3 prepares each once per connection
+    UPSERT_DAY = "INSERT OR REPLACE INTO daily (day, count, seconds, goal) VALUES (?, ?, ?, ?)"
+    INSERT_SESSION = "INSERT INTO sessions (day, started, ended, mode, interrupted) VALUES (?, ?, ?, ?, ?)"
+
+    def __init__(self, writer, path="pomodoro_history.db"):
+        self._connection = None  # The writer thread's connection, kept open between batches
+        super().__init__(writer, path)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; fsync on checkpoint
+        connection.executescript(self.SCHEMA)
+        return connection
+
+    def _connect_read_only(self):
+        """A connection for reads that never changes the database or its schema"""
+        uri = "file:" + urllib_request.pathname2url(os.path.abspath(self.path)) + "?mode=ro"
+        return sqlite3.connect(uri, uri=True)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return False
+        connection = self._connect_read_only()
+        try:
+            for row in connection.execute("SELECT day, count, seconds, goal FROM daily ORDER BY day"):
+                self._rows.extend(row)
+        finally:
+            connection.close()
+        self._ordinals = self._rows[0::self.FIELDS]
+        return True
+
+    def _run_batch(self, batch):
+        """Apply (statement, parameter rows) pairs in one transaction; runs on the writer thread"""
+        if self._connection is None:
+            self._connection = self._connect()
+        with self._connection:
+            for statement, rows in batch:
+                self._connection.executemany(statement, rows)
+
+    def close(self):
+        """Queue closing the writer connection, which checkpoints the WAL into the database file"""
+        self.writer.call(self.path, self._close_connection)
+
+    def _close_connection(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _submit(self, batch):
+        self.writer.call(self.path, lambda: self._run_batch(batch))
+        self.exists = True
+
+    @staticmethod
+    def _session_row(day, session):
+        started, ended, mode, interrupted = session
+        return (day.toordinal(), started, ended, mode, int(interrupted))
+
+    def upsert(self, day, count, seconds, goal, session=None):
+        index, _ = self._put(day, count, seconds, goal)
+        batch = [(self.UPSERT_DAY, [tuple(self._rows[index * self.FIELDS:(index + 1) * self.FIELDS])])]
+        if session is not None:
+            batch.append((self.INSERT_SESSION, [self._session_row(day, session)]))
+        self._submit(batch)
+
+    def add_session(self, day, session):
+        self._submit([(self.INSERT_SESSION, [self._session_row(day, session)])])
+
+    def save(self):
+        """Queue a full rewrite of the daily rows; sessions are kept"""
+        rows = [tuple(self._rows[i:i + self.FIELDS]) for i in range(0, len(self._rows), self.FIELDS)]
+        self._submit([("DELETE FROM daily", [()]), (self.UPSERT_DAY, rows)])
+
+    def session_counts(self):
+        self.writer.flush()
+        if not os.path.exists(self.path):
+            return {}
+        connection = self._connect_read_only()
+        try:
+            query = "SELECT mode, interrupted, COUNT(*) FROM sessions GROUP BY mode, interrupted"
+            counts = {}
+            for mode, interrupted, count in connection.execute(query):
+                counts.setdefault(mode, {"completed": 0, "interrupted": 0})
+                counts[mode]["interrupted" if interrupted else "completed"] = count
+            return counts
+        finally:
+            connection.close()
+
+
+class HistoryAnalytics:
+    """Vectorized statistics over the daily history, shared by the History window and the CLI"""
+
+    ROLLING_WINDOWS = (7, 30, 90)
+    PERCENTILES = (50, 75, 90, 95)
+
+    def __init__(self, store, today=None, clock=None):
+        """today defaults to the clock's date, so virtual-clock runs see their own calendar"""
+        # Zero-copy view of the store's flat records (or of a copied record array): ordinal, count, seconds, goal
+        records = store.raw_records() if isinstance(store, HistoryStore) else store
+        records = np.frombuffer(records, dtype=np.uint32).reshape(-1, HistoryStore.FIELDS)
+        self.ordinals = records[:, 0].astype(np.int64)
+        self.counts = records[:, 1].astype(np.int64)
+        self.seconds = records[:, 2].astype(np.int64)
+        self.goals = records[:, 3].astype(np.int64)
+        today_ordinal = (today or (clock or SystemClock()).today()).toordinal()
+
+        # Dense per-calendar-day series so gaps count as zero days
+        if len(self.ordinals):
+            self.start = int(self.ordinals[0])
+            end = max(today_ordinal, int(self.ordinals[-1]))
+        else:
+            self.start = end = today_ordinal
+        self.daily_seconds = np.zeros(end - self.start + 1, dtype=np.int64)
+        self.daily_counts = np.zeros(end - self.start + 1, dtype=np.int64)
+        self.daily_seconds[self.ordinals - self.start] = self.seconds
+        self.daily_counts[self.ordinals - self.start] = self.counts
+        self.today_index = today_ordinal - self.start
+
+    def window_totals(self, days):
+        """Pomodoros and hours over the last `days` recorded rows"""
+        return int(self.counts[-days:].sum()), float(self.seconds[-days:].sum()) / 3600
+
+    def rolling_average_hours(self, window):
+        """Hours per calendar day averaged over a trailing window, one value per day"""
+        cumulative = np.concatenate(([0], np.cumsum(self.daily_seconds)))
+        ends = np.arange(1, len(self.daily_seconds) + 1)
+        starts = np.maximum(0, ends - window)
+        return (cumulative[ends] - cumulative[starts]) / (ends - starts) / 3600
+
+    def streaks(self):
+        """(current, longest) runs of consecutive days with at least one pomodoro"""
+        active = np.concatenate(([False], self.daily_counts > 0, [False]))
+        edges = np.flatnonzero(np.diff(active.astype(np.int8)))
+        run_starts, run_ends = edges[0::2], edges[1::2]  # run_ends is exclusive
+        if not len(run_starts):
+            return 0, 0
+        longest = int((run_ends - run_starts).max())
+        # A streak is still current if it reaches today or yesterday (today may not have started)
+        current = int(run_ends[-1] - run_starts[-1]) if run_ends[-1] >= self.today_index else 0
+        return current, longest
+
+    def goal_hit_ratio(self):
+        """Share of recorded days whose worked time reached that day's mega goal"""
+        with_goal = self.goals > 0
+        if not with_goal.any():
+            return 0.0
+        return float((self.seconds[with_goal] >= self.goals[with_goal]).mean())
+
+    def weekday_hours(self):
+        """Average hours worked per weekday, Monday first"""
+        weekdays = (np.arange(self.start, self.start + len(self.daily_seconds)) - 1) % 7
+        totals = np.bincount(weekdays, weights=self.daily_seconds, minlength=7)
+        days = np.bincount(weekdays, minlength=7)
+        return totals / np.maximum(days, 1) / 3600
+
+    def calendar_heatmap(self, weeks=52):
+        """Hours per day as a (weeks, 7) grid ending with the current week, Monday first"""
+        last = self.start + len(self.daily_seconds) - 1
+        week_end = last + 6 - (last - 1) % 7  # Sunday of the last week
+        first = week_end - weeks * 7 + 1
+        grid = np.zeros(weeks * 7, dtype=np.float64)
+        lo = max(first, self.start)
+        grid[lo - first:last - first + 1] = self.daily_seconds[lo - self.start:] / 3600
+        return grid.reshape(weeks, 7)
+
+    def hours_percentiles(self):
+        """Percentiles of hours worked on active days"""
+        active = self.seconds[self.counts > 0]
+        if not len(active):
+            return {p: 0.0 for p in self.PERCENTILES}
+        values = np.percentile(active / 3600, self.PERCENTILES)
+        return {p: float(v) for p, v in zip(self.PERCENTILES, values)}
+
+    def summary(self, window_days=30):
+        current_streak, longest_streak = self.streaks()
+        window_pomodoros, window_hours = self.window_totals(window_days)
+        shown_days = min(window_days, len(self.ordinals))
+        return {
+            "days_recorded": int(len(self.ordinals)),
+            "total_pomodoros": int(self.counts.sum()),
+            "total_hours": float(self.seconds.sum()) / 3600,
+            "window_days": shown_days,
+            "window_pomodoros": window_pomodoros,
+            "window_hours": window_hours,
+            "window_daily_average": window_hours / shown_days if shown_days else 0.0,
+            "rolling_average_hours": {
+                window: float(self.rolling_average_hours(window)[self.today_index])
+                for window in self.ROLLING_WINDOWS
+            },
+            "current_streak": current_streak,
+            "longest_streak": longest_streak,
+            "goal_hit_ratio": self.goal_hit_ratio(),
+            "hours_percentiles": self.hours_percentiles(),
+            "weekday_hours": [float(v) for v in self.weekday_hours()],
+        }
+
+
+class EventJournal:
+    """Append-only JSON-lines log of state changes, compacted into the JSON snapshots"""
+
+    def __init__(self, writer, path="pomodoro_journal.jsonl", compact_every=500):
+        self.writer = writer
+        self.path = path
+        self.compact_every = compact_every  # Events before the snapshot is rewritten
+        self.event_count = 0
+
+    def append(self, event, **fields):
+        """Queue one event as a single line; returns True once compaction is due"""
+        fields["event"] = event
+        self.writer.append(self.path, json.dumps(fields, separators=(",", ":")) + "\n")
+        self.event_count += 1
+        return self.event_count >= self.compact_every
+
+    def replay(self):
+        """Yield logged events in order, stopping at a torn or corrupt trailing line"""
+        self.event_count = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    self.event_count += 1
+                    yield record
+        except FileNotFoundError:
+            return
+
+    def reset(self):
+        """Drop all events once they are folded into a snapshot (queued after the snapshot writes)"""
+        self.writer.replace(self.path, "")
+        self.event_count = 0
+
+
+def file_stamp(path):
+    """(mtime_ns, size) of path, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
 class PomodoroTimer:
-    def __init__(self):
+    SNAPSHOT_PATH = "pomodoro_snapshot.json"
+    # Files the snapshot is derived from; if any changed since it was written, it is ignored
+    SNAPSHOT_SOURCES = ("settings.json", "session_state.json", "pomodoro_history.bin",
+                        "pomodoro_history.db", "pomodoro_history.json")
+
+    def __init__(self, clock=None, read_only=False):
+        self.clock = clock or SystemClock()
         self.auto_switch = True  # Change default to True since settings will override it
-        self.load_settings()
-        self.today = datetime.date.today()
+        self.writer = PersistenceWriter(read_only=read_only)  # Read-only loads, replays and migrates in memory
+        snapshot = self._load_snapshot()
+        self.load_settings(snapshot["settings"] if snapshot else None)
+        self.today = self.clock.today()
         self.sessions_completed = 0
-        self.load_state()  # This will now properly override auto_switch from session state
-        self.historical_data = self.load_historical_data()
+        if snapshot is None:
+            self.load_state()  # This will now properly override auto_switch from session state
+        elif not self._apply_state(snapshot["state"]):
+            self._init_new_day()
+        self._snapshot_summary = snapshot and snapshot.get("summary")
+        self._history = None  # Loaded on first use, or in the background by preload_history
+        self._history_lock = threading.Lock()
+        self.journal = EventJournal(self.writer)
+        self.replay_journal()  # Apply events logged after the last snapshot
         self._last_save_time = 0
         self.save_interval = 5  # Save state every 5 seconds
 
+    @property
+    def historical_data(self):
+        with self._history_lock:
+            if self._history is None:
+                self._history = self.load_historical_data()
+            return self._history
+
+    def preload_history(self, analytics=False):
+        """Load the history (and NumPy for analytics) on a background thread"""
+        def load():
+            self.historical_data
+            if analytics:
+                np._import()
+
+        threading.Thread(target=lambda: safe_operation(load, "Error loading history"),
+                         name="history-loader", daemon=True).start()
+
+    def _load_snapshot(self):
+        """The startup snapshot, or None if it is missing, unreadable or older than its sources"""
+        try:
+            with open(self.SNAPSHOT_PATH, "r") as f:
+                snapshot = json.load(f)
+            if snapshot.get("version") != 1:
+                return None
+            if any(file_stamp(path) != snapshot["sources"].get(path) for path in self.SNAPSHOT_SOURCES):
+                return None
+            return snapshot
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, AttributeError) as e:
+            print(f"Ignoring startup snapshot: {e}")
+            return None
+
+    def _snapshot(self):
+        """Return a function that renders the snapshot; stamps and summary are taken on the writer thread"""
+        settings = self._settings_record()
+        state = self._state_record()
+        today = self.today
+        records = array("I", self._history.raw_records()) if self._history is not None else None
+        summary = self._snapshot_summary
+
+        def render():
+            snapshot_summary = summary  # History never loaded, so the previous summary still holds
+            if records is not None:
+                snapshot_summary = None
+                if np.is_imported:  # Never imports NumPy just for the snapshot
+                    snapshot_summary = dict(HistoryAnalytics(records, today=today).summary(), date=today.isoformat())
+            return json.dumps({
+                "version": 1,
+                "settings": settings,
+                "state": state,  # Includes today's totals
+                "summary": snapshot_summary,
+                "sources": {path: file_stamp(path) for path in self.SNAPSHOT_SOURCES},
+            })
+
+        return render
+
+    def cached_summary(self):
+        """Today's analytics summary from the startup snapshot, if still current"""
+        summary = self._snapshot_summary
+        if self._history is None and summary and summary.get("date") == self.clock.today().isoformat():
+            return {key: value for key, value in summary.items() if key != "date"}
+        return None
+
     def load_state(self):
         """Load today's session state"""
         try:
             with open("session_state.json", "r") as f:
                 state = json.load(f)
-                if state.get("date") == self.today.isoformat():
-                    self.current_time = state.get("current_time", self.pomodoro_time)
-                    self.pomodoro_count = state.get("pomodoro_count", 0)
-                    self.total_pomodoro_time = state.get("total_time", 0)
-                    self._daily_time = state.get("daily_time", 0)
-                    self.mode = state.get("mode", "Pomodoro")
-                    self.sessions_completed = state.get("sessions_completed", 0)  # Add this line
-                    self.auto_switch = bool(state.get("auto_switch", self.auto_switch))  # Ensure boolean conversion
-                else:
+                if not self._apply_state(state):
                     self._init_new_day()
         except FileNotFoundError:
             self._init_new_day()
@@ -59,6 +822,28 @@ class PomodoroTimer:
             print(f"Error loading state: {e}")
             self._init_new_day()
 
+    def _apply_state(self, state):
+        """Apply a saved state record if it belongs to today"""
+        if state.get("date") != self.today.isoformat():
+            return False
+        self.current_time = state.get("current_time", self.pomodoro_time)
+        self.pomodoro_count = state.get("pomodoro_count", 0)
+        self.total_pomodoro_time = state.get("total_time", 0)
+        self._daily_time = state.get("daily_time", 0)
+        self.mode = state.get("mode", "Pomodoro")
+        self.sessions_completed = state.get("sessions_completed", 0)
+        self.auto_switch = bool(state.get("auto_switch", self.auto_switch))  # Ensure boolean conversion
+        return True
+
+    def check_new_day(self):
+        """Start fresh daily counters once the clock has passed midnight; returns True if it did"""
+        today = self.clock.today()
+        if today == self.today:
+            return False
+        self.today = today
+        self._init_new_day()
+        return True
+
     def _init_new_day(self):
         """Initialize state for a new day"""
         self.current_time = self.pomodoro_time
@@ -72,46 +857,105 @@ class PomodoroTimer:
         if not hasattr(self, '_last_save_time'):
             self._last_save_time = 0
 
-        current_time = time.time()
+        current_time = self.clock.time()
         if current_time - self._last_save_time < self.save_interval:
             return
 
         def _save():
-            state = {
-                "date": self.today.isoformat(),
-                "current_time": max(0, self.current_time),  # Ensure non-negative
-                "pomodoro_count": max(0, self.pomodoro_count),
-                "total_time": max(0, self.total_pomodoro_time),
-                "daily_time": max(0, self._daily_time),
-                "mode": self.mode,
-                "sessions_completed": max(0, self.sessions_completed),
-                "auto_switch": bool(self.auto_switch)  # Ensure boolean
-            }
-            with open("session_state.json", "w") as f:
-                json.dump(state, f, indent=2)
+            self._journal_event("tick", **self._state_record())
             self._last_save_time = current_time
 
         safe_operation(_save, "Error saving state")
 
-    def load_settings(self):
-        try:
-            with open("settings.json", "r") as f:
-                settings = json.load(f)
-                self.pomodoro_time = settings["pomodoro"] * 60
-                self.short_break_time = settings["short_break"] * 60
-                self.long_break_time = settings["long_break"] * 60
-                self.mega_goal = settings.get("mega_goal", 4) * 3600  # Default 4 hours
-                self.auto_switch = settings.get("auto_switch", False)
-                self.sound_enabled = settings.get("sound_enabled", True)  # Add sound enabled setting
-                self.rain_sound_path = settings.get("rain_sound_path", "")  # Add this line
-        except FileNotFoundError:
-            self.pomodoro_time = 25 * 60
-            self.short_break_time = 5 * 60
-            self.long_break_time = 15 * 60
-            self.mega_goal = 4 * 3600  # 4 hours in seconds
-            self.auto_switch = False
-            self.sound_enabled = True
-            self.rain_sound_path = ""  # Add this line
+    def _state_record(self):
+        return {
+            "date": self.today.isoformat(),
+            "current_time": max(0, self.current_time),  # Ensure non-negative
+            "pomodoro_count": max(0, self.pomodoro_count),
+            "total_time": max(0, self.total_pomodoro_time),
+            "daily_time": max(0, self._daily_time),
+            "mode": self.mode,
+            "sessions_completed": max(0, self.sessions_completed),
+            "auto_switch": bool(self.auto_switch)  # Ensure boolean
+        }
+
+    def _journal_event(self, event, **fields):
+        """Append an event to the journal and compact once enough have accumulated"""
+        if self.journal.append(event, **fields):
+            self.compact()
+
+    def _history_record(self):
+        """Journal fields for the most recent history row"""
+        d, count, total_time, mega_goal = self.historical_data[-1]
+        return {"day": d.isoformat(), "count": count, "time": total_time, "goal": mega_goal}
+
+    def record_pomodoro(self):
+        """Log a completed pomodoro with the resulting history row and state"""
+        self._journal_event("pomodoro", **self._history_record(), **self._state_record())
+
+    def record_mode_switch(self):
+        safe_operation(lambda: self._journal_event("mode", mode=self.mode), "Error saving state")
+
+    def record_goal_change(self):
+        """Log a mega goal change along with today's history row"""
+        safe_operation(lambda: self._journal_event("goal", **self._history_record()),
+                       "Error saving history")
+
+    def replay_journal(self):
+        """Fold journaled events newer than the snapshots into the loaded state"""
+        for record in self.journal.replay():
+            event = record.get("event")
+            if event in ("tick", "pomodoro"):
+                self._apply_state(record)
+            elif event == "mode" and record.get("mode"):
+                self.mode = record["mode"]
+            if event in ("pomodoro", "goal"):
+                self._replay_history_row(record)
+
+    def _replay_history_row(self, record):
+        """Upsert a journaled history row so replaying an event twice is harmless"""
+        day = datetime.date.fromisoformat(record["day"])
+        self.historical_data.upsert(day, record["count"], record["time"], record["goal"])
+        if day == self.today:
+            self._daily_time = record["time"]
+
+    def compact(self):
+        """Rewrite the state snapshot and truncate the journal"""
+        def _compact():
+            self.writer.replace("session_state.json", json.dumps(self._state_record(), indent=2))
+            self.journal.reset()  # History rows are already patched into the store
+            if self._history is not None:
+                self._history.close()  # Checkpoints SQLite so the snapshot stamps the final file
+            self.writer.replace(self.SNAPSHOT_PATH, self._snapshot())  # Queued last, so its stamps are final
+
+        safe_operation(_compact, "Error compacting journal")
+
+    def load_settings(self, settings=None):
+        """Apply settings.json, or the given settings dict (from the startup snapshot)"""
+        if settings is None:
+            try:
+                with open("settings.json", "r") as f:
+                    settings = json.load(f)
+            except FileNotFoundError:
+                settings = {}
+        self.pomodoro_time = settings.get("pomodoro", 25) * 60
+        self.short_break_time = settings.get("short_break", 5) * 60
+        self.long_break_time = settings.get("long_break", 15) * 60
+        self.mega_goal = settings.get("mega_goal", 4) * 3600  # Default 4 hours
+        self.auto_switch = settings.get("auto_switch", False)
+        self.sound_enabled = settings.get("sound_enabled", True)  # Add sound enabled setting
+        self.rain_sound_path = settings.get("rain_sound_path", "")  # Add this line
+        self.noise_colour = settings.get("noise_colour", "rain")
+        self.noise_intensity = settings.get("noise_intensity", 0.5)
+        track_volumes = settings.get("track_volumes", {"rain": settings.get("noise_volume", 0.8)})
+        self.track_volumes = dict(AmbientMixer.DEFAULT_VOLUMES, **track_volumes)
+        self.track_sources = dict(AmbientMixer.DEFAULT_SOURCES, **settings.get("track_sources", {}))
+        self.sound_volume = settings.get("sound_volume", 1.0)
+        self.control_socket = settings.get("control_socket", True)
+        self.status_format = settings.get("status_format", "{mode} {remaining}")
+        self.desktop_notifications = settings.get("desktop_notifications", True)
+        self.history_backend = settings.get("history_backend", "binary")
+        self.hooks = settings.get("hooks", [])
 
     def get_mode_time(self):
         return {
@@ -120,78 +964,1623 @@ class PomodoroTimer:
             "Long Break": self.long_break_time,
         }.get(self.mode, self.pomodoro_time)
 
-    def load_historical_data(self):
+    def load_historical_data(self):
+        """Open the configured history store, filling a new one from the other backend or the legacy JSON"""
+        try:
+            backends = [HistoryStore, SqliteHistoryStore]
+            if self.history_backend == "sqlite":
+                backends.reverse()
+            store = backends[0](self.writer)
+            if not store.exists:
+                previous = backends[1](self.writer)  # Only reads
+                if previous:
+                    store.replace_all(list(previous))
+                elif os.path.exists("pomodoro_history.json"):
+                    self._migrate_legacy_history(store)
+            today_row = store.get(self.today)
+            if today_row:
+                self._daily_time = today_row[2]
+            return store
+        except Exception as e:
+            print(f"Error loading history: {e}")
+            return HistoryStore(self.writer, path=None)  # In memory only, so nothing on disk is touched
+
+    def _migrate_legacy_history(self, store):
+        """Copy pomodoro_history.json into the store and keep the JSON as a backup"""
+        try:
+            with open("pomodoro_history.json", "r") as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            print(f"Corrupted history file, not migrating: {e}")
+            return
+
+        rows = []
+        skipped = 0
+        for entry in data:
+            try:
+                if len(entry) == 3:  # Format: [date, count, time]
+                    d, count, time_value = entry
+                    mega_goal = self.mega_goal  # Use current mega goal if not stored
+                else:  # New format: [date, count, time, mega_goal]
+                    d, count, time_value, mega_goal = entry
+                rows.append((datetime.date.fromisoformat(d), int(count), int(time_value), int(mega_goal)))
+            except (ValueError, TypeError):
+                skipped += 1
+        if skipped:
+            print(f"Skipped {skipped} malformed rows in pomodoro_history.json")
+
+        store.replace_all(rows)
+        if not self.writer.read_only and self.writer.flush():
+            os.replace("pomodoro_history.json", "pomodoro_history.json.bak")
+
+    def save_settings(self):
+        self.writer.replace("settings.json", json.dumps(self._settings_record()))
+
+    def _settings_record(self):
+        return {
+            "pomodoro": self.pomodoro_time // 60,
+            "short_break": self.short_break_time // 60,
+            "long_break": self.long_break_time // 60,
+            "mega_goal": self.mega_goal // 3600,
+            "auto_switch": self.auto_switch,
+            "sound_enabled": self.sound_enabled,
+            "rain_sound_path": self.rain_sound_path,  # Add this line
+            "noise_colour": self.noise_colour,
+            "noise_intensity": self.noise_intensity,
+            "track_volumes": self.track_volumes,
+            "track_sources": self.track_sources,
+            "sound_volume": self.sound_volume,
+            "control_socket": self.control_socket,
+            "status_format": self.status_format,
+            "desktop_notifications": self.desktop_notifications,
+            "history_backend": self.history_backend,
+            "hooks": self.hooks
+        }
+
+    def complete_pomodoro(self, session=None):
+        """Count a finished pomodoro and add it to today's history; returns False if history failed"""
+        self.pomodoro_count += 1
+        today = self.clock.today()
+        try:
+            _, prev_count, prev_time, _ = self.historical_data.get(today) or (today, 0, 0, 0)
+            self.historical_data.upsert(
+                today,
+                prev_count + 1,
+                prev_time + self.pomodoro_time,
+                self.mega_goal,
+                session=session
+            )
+            saved = self.update_daily_time(self.pomodoro_time)
+        except Exception as e:
+            print(f"Error updating history: {e}")
+            saved = False
+        self.save_state()
+        return saved
+
+    def record_session(self, session):
+        """Keep a phase (start, end, mode, interrupted) that did not complete a pomodoro"""
+        safe_operation(lambda: self.historical_data.add_session(self.clock.today(), session),
+                       "Error saving session")
+
+    def update_daily_time(self, seconds):
+        """Atomic update of daily time"""
+        if seconds <= 0:
+            return False
+        try:
+            self._daily_time += seconds
+            self.record_pomodoro()
+            return True
+        except Exception:
+            return False
+
+
+class WakeupMeter:
+    """Counts scheduler callbacks that actually ran, for the wakeups/sec metric.
+
+    Recent wakeups are kept in one bucket per second of the scheduler's clock,
+    so memory stays fixed however many callbacks run or how fast time moves.
+    """
+
+    WINDOW = 60  # Seconds the rate is averaged over
+
+    def __init__(self, clock=None):
+        self.clock = clock or SystemClock()
+        self.wakeups = 0
+        self._counts = [0] * self.WINDOW
+        self._seconds = [None] * self.WINDOW  # Clock second each bucket is counting
+
+    def count(self):
+        self.wakeups += 1
+        second = int(self.clock.monotonic())
+        slot = second % self.WINDOW
+        if self._seconds[slot] != second:
+            self._seconds[slot] = second
+            self._counts[slot] = 0
+        self._counts[slot] += 1
+
+    def per_second(self):
+        now = int(self.clock.monotonic())
+        recent = sum(count for second, count in zip(self._seconds, self._counts)
+                     if second is not None and now - second < self.WINDOW)
+        return recent / self.WINDOW
+
+
+class TkScheduler:
+    """Engine scheduler backed by the Tk event loop"""
+
+    def __init__(self, master):
+        self.master = master
+        self.meter = WakeupMeter()
+
+    def call_later(self, delay, callback):
+        def run():
+            self.meter.count()
+            callback()
+        return self.master.after(max(1, math.ceil(delay * 1000)), run)
+
+    def cancel(self, handle):
+        try:
+            self.master.after_cancel(handle)
+        except tk.TclError:
+            pass
+
+    def add_reader(self, sock, callback):
+        """Call callback from the Tk loop whenever sock is readable (Unix only)"""
+        def run(_file, _mask):
+            self.meter.count()
+            callback()
+        self.master.tk.createfilehandler(sock, tk.READABLE, run)
+
+    def remove_reader(self, sock):
+        self.master.tk.deletefilehandler(sock)
+
+
+class LoopScheduler:
+    """Single-threaded timer loop for running the engine without Tk"""
+
+    def __init__(self, clock=None):
+        self.clock = clock or SystemClock()
+        self._queue = []  # Heap of (due, handle, callback)
+        self._cancelled = set()
+        self._next_handle = 0
+        self._readers = {}  # Socket -> callback
+        self._running = False
+        self.meter = WakeupMeter(self.clock)
+
+    def call_later(self, delay, callback):
+        self._next_handle += 1
+        heapq.heappush(self._queue, (self.clock.monotonic() + max(0.0, delay), self._next_handle, callback))
+        return self._next_handle
+
+    def cancel(self, handle):
+        self._cancelled.add(handle)
+
+    def add_reader(self, sock, callback):
+        self._readers[sock] = callback
+
+    def remove_reader(self, sock):
+        self._readers.pop(sock, None)
+
+    def run(self):
+        """Run callbacks and socket readers until stop() or nothing is left to wait for"""
+        self._running = True
+        while self._running and (self._queue or self._readers):
+            wait = None
+            if self._queue:
+                due, handle, callback = self._queue[0]
+                if handle in self._cancelled:
+                    heapq.heappop(self._queue)
+                    self._cancelled.discard(handle)
+                    continue
+                wait = due - self.clock.monotonic()
+                if wait <= 0:
+                    heapq.heappop(self._queue)
+                    self.meter.count()
+                    callback()
+                    continue
+            if not self._readers:
+                self.clock.sleep(wait)
+                continue
+            readable, _, _ = select.select(list(self._readers), [], [], wait)
+            for sock in readable:
+                callback = self._readers.get(sock)
+                if callback:
+                    self.meter.count()
+                    callback()
+
+    def stop(self):
+        self._running = False
+
+
+class TimerEngine:
+    """Countdown and mode state machine shared by the GUI and the headless daemon.
+
+    One monotonic deadline (from the timer's clock) is kept per phase and the
+    scheduler is asked for exactly one wakeup per visible second, or only for
+    the phase end when tick_wakeups is off and nothing displays the countdown.
+    Displays that come and go (a mapped window, a socket watcher) hold ticks
+    with want_ticks() instead of flipping tick_wakeups.
+    Listeners subscribe to "start", "pause", "resume", "reset", "tick",
+    "session", "complete", "mode" and "day" events.
+
+    Every scheduled callback carries the phase token that was current when it
+    was scheduled. Arming, disarming or stopping the countdown bumps the token,
+    so a callback that was already queued is ignored instead of waited for.
+    """
+
+    SWITCH_DELAY = 0.5  # Seconds between a phase ending and the next one starting
+
+    def __init__(self, timer, scheduler, tick_wakeups=True):
+        self.timer = timer
+        self.clock = timer.clock
+        self.scheduler = scheduler
+        self.tick_wakeups = tick_wakeups
+        self._tick_holders = set()
+        self.is_running = False
+        self.is_paused = False
+        self._deadline = None  # clock.monotonic() at which the current phase ends
+        self._phase_offset = 0.0  # Sub-second remainder carried across pause/resume
+        self._wakeup = None
+        self._pending_switch = None
+        self._phase_token = 0
+        self._phase_started = None  # clock.time() when the current phase was first started
+        self._listeners = {}
+
+    def subscribe(self, event, callback):
+        self._listeners.setdefault(event, []).append(callback)
+
+    def _emit(self, event, *args):
+        for callback in self._listeners.get(event, ()):
+            safe_operation(lambda: callback(*args), f"Error in {event} listener")
+
+    def toggle(self):
+        if not self.is_running:
+            self.start()
+        elif self.is_paused:
+            self.resume()
+        else:
+            self.pause()
+
+    def start(self):
+        if self.is_running:
+            return
+        # Reset timer if it's at 0
+        if self.timer.current_time <= 0:
+            self.timer.current_time = self.timer.get_mode_time()
+            self._phase_offset = 0.0
+        if self._phase_started is None:
+            self._phase_started = self.clock.time()
+        self.is_running = True
+        self.is_paused = False
+        self._arm_deadline()
+        self._emit("start")
+        self.timer.save_state()
+
+    def pause(self):
+        if not self.is_running or self.is_paused:
+            return
+        self._disarm_deadline()
+        if not self.is_running:  # Phase ended while settling the last tick
+            return
+        self.is_paused = True
+        self._emit("pause")
+        self.timer.save_state()
+
+    def resume(self):
+        if not self.is_running or not self.is_paused:
+            return
+        self.is_paused = False
+        self._arm_deadline()
+        self._emit("resume")
+        self.timer.save_state()
+
+    def reset(self):
+        """Stop the countdown and restore the full time for the current mode"""
+        self._stop()
+        self._end_session(interrupted=True)
+        self.timer.current_time = self.timer.get_mode_time()
+        self._phase_offset = 0.0
+        self._emit("reset")
+        self.timer.save_state()
+
+    def set_mode(self, mode):
+        """Select a mode without starting it (the mode menu)"""
+        self._end_session(interrupted=True)
+        self.timer.mode = mode
+        self.timer.record_mode_switch()
+        self.reset()
+        self._emit("mode", mode)
+
+    def switch_mode(self, new_mode):
+        """Switch to new_mode and start its countdown"""
+        self._stop()
+        self._end_session(interrupted=True)
+        if self.timer.check_new_day():
+            self._emit("day")
+        self.timer.mode = new_mode
+        self.timer.current_time = self.timer.get_mode_time()
+        self._phase_offset = 0.0
+        self.timer.record_mode_switch()
+        self._emit("mode", new_mode)
+
+        self._phase_started = self.clock.time()
+        self.is_running = True
+        self.is_paused = False
+        self._arm_deadline()
+        self._emit("start")
+
+    def want_ticks(self, holder, wanted=True):
+        """Hold (or release) per-second wakeups on behalf of holder; takes effect mid-phase"""
+        before = self.ticking
+        if wanted:
+            self._tick_holders.add(holder)
+        else:
+            self._tick_holders.discard(holder)
+        if self.ticking == before or self._deadline is None or not self.is_running or self.is_paused:
+            return
+        self._cancel_wakeup()
+        if not self._advance():  # Catch up on seconds skipped while nobody was looking
+            self._schedule_wakeup()
+
+    @property
+    def ticking(self):
+        """True while something displays the countdown and needs a wakeup every second"""
+        return self.tick_wakeups or bool(self._tick_holders)
+
+    def _end_session(self, interrupted):
+        """Close the current phase's session; interrupted ones are recorded right away"""
+        if self._phase_started is None:
+            return None
+        session = (self._phase_started, self.clock.time(), self.timer.mode, interrupted)
+        self._phase_started = None
+        if interrupted:
+            self.timer.record_session(session)
+        return session
+
+    def status(self):
+        """Snapshot of the timer for status queries and event subscribers"""
+        return {
+            "mode": self.timer.mode,
+            "remaining": self.remaining_seconds(),
+            "duration": self.timer.get_mode_time(),
+            "running": self.is_running,
+            "paused": self.is_paused,
+            "pomodoro_count": self.timer.pomodoro_count,
+            "total_time": self.timer.total_pomodoro_time,
+            "sessions_completed": self.timer.sessions_completed,
+        }
+
+    def next_mode(self):
+        """Determine next timer mode"""
+        if self.timer.mode == "Pomodoro":
+            return "Long Break" if self.timer.pomodoro_count % 4 == 0 else "Short Break"
+        return "Pomodoro"
+
+    def shutdown(self):
+        """Settle elapsed time and cancel every pending wakeup"""
+        self._stop()
+
+    def _stop(self):
+        self._disarm_deadline()
+        self._phase_token += 1
+        self.is_running = False
+        self.is_paused = False
+        if self._pending_switch is not None:
+            self.scheduler.cancel(self._pending_switch)
+            self._pending_switch = None
+
+    def remaining_seconds(self):
+        """Whole seconds left in the phase, derived from the monotonic deadline"""
+        if self._deadline is None:
+            return self.timer.current_time
+        return max(0, math.ceil(self._deadline - self.clock.monotonic()))
+
+    def _arm_deadline(self):
+        """Set the phase deadline from the remaining time and schedule the first tick"""
+        self._cancel_wakeup()
+        self._phase_token += 1
+        self._deadline = self.clock.monotonic() + self.timer.current_time + self._phase_offset
+        self._phase_offset = 0.0
+        self._schedule_wakeup()
+
+    def _disarm_deadline(self):
+        """Freeze the countdown, keeping the sub-second remainder for resume"""
+        self._cancel_wakeup()
+        if self._deadline is not None and self.is_running and not self.is_paused:
+            self._advance()  # Settle seconds elapsed since the last wakeup
+        if self._deadline is not None:
+            left = max(0.0, self._deadline - self.clock.monotonic())
+            self._phase_offset = min(0.0, left - self.timer.current_time)
+        self._deadline = None
+        self._phase_token += 1
+
+    def _schedule_wakeup(self):
+        """Schedule exactly one wakeup for the next visible second (or the phase end)"""
+        if self._deadline is None:
+            return
+        next_change = self._deadline
+        if self.ticking:
+            next_change -= self.timer.current_time - 1
+        self._wakeup = self.scheduler.call_later(
+            next_change - self.clock.monotonic(), lambda token=self._phase_token: self._on_wakeup(token)
+        )
+
+    def _cancel_wakeup(self):
+        if self._wakeup is not None:
+            self.scheduler.cancel(self._wakeup)
+            self._wakeup = None
+
+    def _on_wakeup(self, token):
+        """Deadline wakeup: apply elapsed time, then schedule the next visible change"""
+        if token != self._phase_token:
+            return  # Stale wakeup from a cancelled phase
+        self._wakeup = None
+        if not self.is_running or self.is_paused or self._deadline is None:
+            return
+        if not self._advance():
+            self._schedule_wakeup()
+
+    def _advance(self):
+        """Apply every second elapsed since the last wakeup; return True if the phase ended"""
+        remaining = self.remaining_seconds()
+        elapsed = self.timer.current_time - remaining
+        if elapsed > 0:
+            self.timer.current_time = remaining
+
+            # Handle Pomodoro mode updates
+            if self.timer.mode == "Pomodoro":
+                previous_total = self.timer.total_pomodoro_time
+                self.timer.total_pomodoro_time += elapsed
+
+                # Check for session completion (one per 30 minutes worked)
+                new_sessions = self.timer.total_pomodoro_time // 1800 - previous_total // 1800
+                if new_sessions > 0:
+                    self.timer.sessions_completed += new_sessions
+                    self._emit("session")
+
+            self._emit("tick")
+            self.timer.save_state()
+
+        # Check completion after updates
+        if self.timer.current_time == 0:
+            self._deadline = None
+            self._complete()
+            return True
+        return False
+
+    def _complete(self):
+        """Book the finished phase, notify listeners, then start the next phase shortly after"""
+        self._cancel_wakeup()
+        self.is_running = False
+        self.is_paused = False
+        finished_mode = self.timer.mode
+        history_saved = True
+        session = self._end_session(interrupted=False)
+        if finished_mode == "Pomodoro":
+            history_saved = self.timer.complete_pomodoro(session)
+        elif session is not None:
+            self.timer.record_session(session)
+        next_mode = self.next_mode()
+        self._emit("complete", finished_mode, next_mode, history_saved)
+        self.timer.save_state()
+
+        token = self._phase_token
+
+        def switch():
+            if token != self._phase_token:
+                return  # The user started, reset or switched in the meantime
+            self._pending_switch = None
+            self.switch_mode(next_mode)
+
+        self._pending_switch = self.scheduler.call_later(self.SWITCH_DELAY, switch)
+
+
+class InstanceLock:
+    """Exclusive advisory lock on a file next to the state files.
+
+    Only the process holding it may write settings, state, journal and
+    history, so a second window or daemon started in the same directory
+    cannot interleave writes with the first.
+    """
+
+    def __init__(self, path="pomodoro.lock"):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        """Take the lock without waiting; returns False if another process holds it"""
+        lock_file = open(self.path, "a+")
+        try:
+            lock_file.seek(0)
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        if fcntl:
+            lock_file.truncate()
+            lock_file.write(f"{os.getpid()}\n")
+            lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is not None:
+            self._file.close()  # Closing the descriptor drops the lock
+            self._file = None
+
+
+def default_control_socket_path(data_dir="."):
+    """Socket of the instance that owns data_dir; one per data directory, like pomodoro.lock.
+
+    The socket itself lives in the runtime directory, named after a hash of the
+    data directory, because socket paths are limited to about 100 bytes.
+    """
+    key = f"{zlib.crc32(os.path.realpath(data_dir).encode()):08x}"
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, f"pomodoro-{key}.sock")
+    return os.path.join(tempfile.gettempdir(), f"pomodoro-{os.getuid()}-{key}.sock")
+
+
+class ControlServer:
+    """Unix-socket control channel for a running timer.
+
+    Clients send one JSON object per line, e.g. {"cmd": "status"}, and get one
+    JSON line back. Commands: status, start, pause, reset, set-mode (with
+    "mode") and subscribe, after which every engine event is pushed to the
+    client as {"event": ..., "status": {...}}. watch (with an optional
+    "format") instead streams plain text lines for status bars, one per change
+    of the rendered text. activate (with "argv") hands a second launch's
+    arguments to on_activate, which the window uses to raise itself. metrics
+    reports the scheduler's wakeups per second, per-hook latency and the
+    persistence writer's queue depth and write latency. Subscribers and watchers hold
+    per-second engine ticks only while they are connected.
+    """
+
+    EVENTS = ("start", "pause", "resume", "reset", "tick", "complete", "mode")
+    MAX_LINE = 4096
+
+    def __init__(self, engine, scheduler, path=None):
+        self.engine = engine
+        self.scheduler = scheduler
+        self.path = path or default_control_socket_path()
+        self._listener = None
+        self._clients = {}  # Socket -> unread bytes
+        self._subscribers = set()
+        self._watchers = {}  # Socket -> [format, last text sent]
+        self.on_activate = None
+        self.hooks = None  # HookRunner whose stats the metrics command reports
+        for event in self.EVENTS:
+            engine.subscribe(event, lambda *args, event=event: self._broadcast(event))
+
+    def start(self):
+        """Bind the socket; returns False if another live instance already owns it"""
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+                return False
+            except OSError:
+                os.unlink(self.path)  # Stale socket from a crashed run
+            finally:
+                probe.close()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        os.chmod(self.path, 0o600)
+        listener.listen(8)
+        listener.setblocking(False)
+        self._listener = listener
+        self.scheduler.add_reader(listener, self._accept)
+        return True
+
+    def close(self):
+        for client in list(self._clients):
+            self._drop(client)
+        if self._listener is not None:
+            self.scheduler.remove_reader(self._listener)
+            self._listener.close()
+            self._listener = None
+            safe_operation(lambda: os.unlink(self.path), "Error removing control socket")
+
+    def _accept(self):
+        try:
+            client, _ = self._listener.accept()
+        except BlockingIOError:
+            return
+        client.setblocking(False)
+        self._clients[client] = b""
+        self.scheduler.add_reader(client, lambda: self._read(client))
+
+    def _drop(self, client):
+        self.scheduler.remove_reader(client)
+        self._clients.pop(client, None)
+        self._subscribers.discard(client)
+        self._watchers.pop(client, None)
+        self._update_ticks()
+        client.close()
+
+    def _update_ticks(self):
+        self.engine.want_ticks(self, bool(self._subscribers or self._watchers))
+
+    def _read(self, client):
+        try:
+            data = client.recv(self.MAX_LINE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(client)
+            return
+        buffer = self._clients[client] + data
+        *lines, rest = buffer.split(b"\n")
+        if len(rest) > self.MAX_LINE:
+            self._drop(client)
+            return
+        self._clients[client] = rest
+        for line in lines:
+            if line.strip():
+                response = self.handle(line, client)
+                if response is not None:
+                    self._send(client, response)
+
+    def handle(self, line, client=None):
+        """Run one request line and return the response object"""
+        try:
+            request = json.loads(line)
+            command = request["cmd"]
+        except (ValueError, KeyError, TypeError):
+            return {"ok": False, "error": "expected a JSON object with a \"cmd\" field"}
+
+        if command == "start":
+            if self.engine.is_paused:
+                self.engine.resume()
+            else:
+                self.engine.start()
+        elif command == "pause":
+            self.engine.pause()
+        elif command == "reset":
+            self.engine.reset()
+        elif command == "set-mode":
+            if request.get("mode") not in ("Pomodoro", "Short Break", "Long Break"):
+                return {"ok": False, "error": "mode must be Pomodoro, Short Break or Long Break"}
+            self.engine.set_mode(request["mode"])
+        elif command == "subscribe":
+            if client is not None:
+                # Acknowledge first: holding ticks catches up and broadcasts a tick at once
+                self._send(client, {"ok": True, "status": self.engine.status()})
+                if client in self._clients:
+                    self._subscribers.add(client)
+                    self._update_ticks()
+                return None
+        elif command == "activate":
+            if self.on_activate is None:
+                return {"ok": False, "error": "no window to activate"}
+            self.on_activate(list(request.get("argv", [])))
+        elif command == "watch":
+            status_format = request.get("format") or self.engine.timer.status_format
+            try:
+                format_status(status_format, self.engine.status())  # Only validates the format
+            except (KeyError, ValueError, IndexError) as e:
+                return {"ok": False, "error": f"bad format: {e}"}
+            if client is not None:
+                self._watchers[client] = [status_format, None]
+                self._update_ticks()
+                self._push_watch(client)
+                return None
+        elif command == "metrics":
+            return {"ok": True, "metrics": {
+                "wakeups": self.scheduler.meter.wakeups,
+                "wakeups_per_second": round(self.scheduler.meter.per_second(), 3),
+                "ticking": self.engine.ticking,
+                "hooks": self.hooks.snapshot() if self.hooks is not None else {},
+                "hook_python_threads": self.hooks.python_threads if self.hooks is not None else 0,
+                "writer": self.engine.timer.writer.stats(),
+            }}
+        elif command != "status":
+            return {"ok": False, "error": f"unknown command {command!r}"}
+        return {"ok": True, "status": self.engine.status()}
+
+    def _send(self, client, message):
+        try:
+            client.sendall(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+        except OSError:  # Includes a full buffer on a subscriber that stopped reading
+            self._drop(client)
+
+    def _broadcast(self, event):
+        for client in list(self._watchers):
+            self._push_watch(client)
+        if not self._subscribers:
+            return
+        message = {"event": event, "status": self.engine.status()}
+        for client in list(self._subscribers):
+            self._send(client, message)
+
+    def _push_watch(self, client):
+        """Send the watcher's rendered line, but only if it differs from the last one"""
+        watch = self._watchers[client]
+        text = format_status(watch[0], self.engine.status())
+        if text == watch[1]:
+            return
+        watch[1] = text
+        try:
+            client.sendall(text.encode() + b"\n")
+        except OSError:
+            self._drop(client)
+
+
+def format_status(status_format, status):
+    """Render a status-bar line; fields: {mode} {remaining} {minutes} {seconds} {state}
+    {percent} {pomodoro_count} {sessions_completed} {total_time}"""
+    remaining = status["remaining"]
+    duration = max(1, status["duration"])
+    if not status["running"]:
+        state = "stopped"
+    else:
+        state = "paused" if status["paused"] else "running"
+    fields = {
+        "mode": status["mode"],
+        "remaining": PomodoroTimerGUI.format_time(remaining),
+        "minutes": math.ceil(remaining / 60),
+        "seconds": remaining,
+        "state": state,
+        "percent": int((1 - remaining / duration) * 100),
+        "pomodoro_count": status["pomodoro_count"],
+        "sessions_completed": status["sessions_completed"],
+        "total_time": time.strftime("%H:%M:%S", time.gmtime(status["total_time"])),
+    }
+    return status_format.format_map(fields).replace("\n", " ")
+
+
+def start_control_server(engine, timer):
+    """Serve the control socket if enabled in settings and supported here; returns the server or None"""
+    if not timer.control_socket or not hasattr(socket, "AF_UNIX"):
+        return None
+    server = ControlServer(engine, engine.scheduler)
+    if not safe_operation(server.start, "Control socket unavailable", False):
+        return None
+    return server
+
+
+def send_control_command(request, path=None, follow=False):
+    """Send one request to a running timer and print the JSON responses"""
+    path = path or default_control_socket_path()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        client.sendall(json.dumps(request).encode() + b"\n")
+        with client.makefile("r", encoding="utf-8") as responses:
+            for line in responses:
+                print(line, end="", flush=True)
+                if not follow:
+                    break
+
+
+def activate_running_instance(argv, path=None):
+    """Hand argv to the instance that owns the control socket; returns True if it took them"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(2)
+            client.connect(path or default_control_socket_path())
+            client.sendall(json.dumps({"cmd": "activate", "argv": argv}).encode() + b"\n")
+            with client.makefile("r", encoding="utf-8") as responses:
+                return json.loads(responses.readline() or "{}").get("ok", False)
+    except (OSError, AttributeError, ValueError):  # AttributeError: no AF_UNIX on this platform
+        return False
+
+
+class NotifySendBackend:
+    """Desktop notifications through libnotify's notify-send"""
+
+    command = "notify-send"
+
+    @classmethod
+    def available(cls):
+        return shutil.which(cls.command) is not None
+
+    def send(self, title, message):
+        subprocess.run([self.command, "--app-name=Pomodoro Timer", title, message],
+                       timeout=5, check=False, capture_output=True)
+
+
+class OsascriptBackend:
+    """Desktop notifications through macOS Notification Center"""
+
+    command = "osascript"
+
+    @classmethod
+    def available(cls):
+        return sys.platform == "darwin" and shutil.which(cls.command) is not None
+
+    def send(self, title, message):
+        script = f"display notification {json.dumps(message)} with title {json.dumps(title)}"
+        subprocess.run([self.command, "-e", script], timeout=5, check=False, capture_output=True)
+
+
+DESKTOP_BACKENDS = [NotifySendBackend, OsascriptBackend]
+
+
+def desktop_backends():
+    """Instances of every desktop notification backend usable on this machine"""
+    return [backend() for backend in DESKTOP_BACKENDS if backend.available()]
+
+
+class Notifier:
+    """Queued, rate-limited notifications that never block the event loop.
+
+    Toasts are shown one at a time through the show/hide callbacks for
+    TOAST_SECONDS each; a message already showing or queued is not repeated,
+    and the queue keeps only the newest MAX_PENDING. Backends (objects with a
+    send(title, message) method) are called on a worker thread, at most once
+    every DESKTOP_INTERVAL seconds, and the oldest undelivered message is
+    dropped when the worker falls behind.
+    """
+
+    TOAST_SECONDS = 4.0
+    DESKTOP_INTERVAL = 2.0
+    MAX_PENDING = 5
+
+    def __init__(self, scheduler, show, hide, backends=()):
+        self.scheduler = scheduler
+        self._show = show
+        self._hide = hide
+        self.backends = list(backends)
+        self._toasts = deque(maxlen=self.MAX_PENDING)
+        self._current = None
+        self._advance_handle = None
+        self._outbox = deque(maxlen=self.MAX_PENDING)
+        self._has_work = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self.sent = 0
+        self.dropped = 0
+
+    def notify(self, title, message):
+        item = (title, message)
+        if item == self._current or item in self._toasts:
+            return
+        self._toasts.append(item)
+        if self._current is None:
+            self._show_next()
+        if self.backends:
+            self._queue_desktop(item)
+
+    def dismiss(self):
+        """Hide the current toast now and move on to the next one"""
+        if self._advance_handle is not None:
+            self.scheduler.cancel(self._advance_handle)
+        self._show_next()
+
+    def _show_next(self):
+        self._advance_handle = None
+        if not self._toasts:
+            self._current = None
+            safe_operation(self._hide, "Error hiding notification")
+            return
+        self._current = self._toasts.popleft()
+        safe_operation(lambda: self._show(*self._current), "Error showing notification")
+        self._advance_handle = self.scheduler.call_later(self.TOAST_SECONDS, self._show_next)
+
+    def _queue_desktop(self, item):
+        with self._has_work:
+            if len(self._outbox) == self._outbox.maxlen:
+                self.dropped += 1
+            self._outbox.append(item)
+            self._has_work.notify()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._has_work:
+                while not self._outbox and not self._closed:
+                    self._has_work.wait()
+                if self._closed:
+                    return
+                title, message = self._outbox.popleft()
+            for backend in self.backends:
+                safe_operation(lambda: backend.send(title, message),
+                               f"Error sending notification via {type(backend).__name__}")
+            self.sent += 1
+            with self._has_work:
+                self._has_work.wait_for(lambda: self._closed, timeout=self.DESKTOP_INTERVAL)
+
+    def close(self):
+        if self._advance_handle is not None:
+            self.scheduler.cancel(self._advance_handle)
+            self._advance_handle = None
+        with self._has_work:
+            self._closed = True
+            self._has_work.notify_all()
+
+
+class HookRunner:
+    """Runs user hooks for engine events on a small, bounded pool of worker threads.
+
+    Hooks come from the "hooks" list in settings.json, one object per hook
+    with an "event" (complete, start, pause, mode or "*"), exactly one of
+    "shell" (a command line), "python" ("module:function") or "http" (a URL),
+    and optionally "timeout" in seconds and a "name" for the stats. Shell
+    hooks get POMODORO_EVENT, POMODORO_MODE, POMODORO_NEXT_MODE and
+    POMODORO_COUNT in their environment, Python hooks are called as
+    function(event, payload) and HTTP hooks receive the payload as a JSON POST.
+
+    Listeners only queue work, so a slow hook never delays the engine. At most
+    MAX_PENDING runs wait; when the workers fall behind the oldest waiting run
+    is dropped. Python code can't be interrupted, so each Python run gets its
+    own thread and one that outlives its timeout is abandoned; while
+    MAX_PYTHON_THREADS of those threads (running or abandoned) are alive,
+    new Python runs are dropped.
+    Runs, failures, timeouts, abandoned runs, drops and latency are kept per hook.
+    """
+
+    EVENTS = ("complete", "start", "pause", "mode")
+    KINDS = ("shell", "python", "http")
+    WORKERS = 2
+    MAX_PENDING = 16
+    MAX_PYTHON_THREADS = 4
+    DEFAULT_TIMEOUT = 10.0
+
+    def __init__(self, hooks=()):
+        self.hooks = []
+        for hook in hooks:
+            error = self._invalid(hook)
+            if error:
+                print(f"Ignoring hook {hook!r}: {error}")
+                continue
+            kind = next(kind for kind in self.KINDS if kind in hook)
+            self.hooks.append(dict(hook, kind=kind, name=hook.get("name") or f"{kind}:{hook[kind]}"))
+        self.stats = {hook["name"]: {"runs": 0, "failures": 0, "timeouts": 0, "abandoned": 0, "dropped": 0,
+                                     "last_ms": None, "max_ms": 0.0, "total_ms": 0.0}
+                      for hook in self.hooks}
+        self._pending = deque()
+        self._has_work = threading.Condition()
+        self._closed = False
+        self._workers = []
+        self._python_calls = []  # Python hook threads, including abandoned ones still running
+        self._functions = {}  # "module:function" -> resolved callable
+
+    def _invalid(self, hook):
+        if not isinstance(hook, dict):
+            return "expected an object"
+        if hook.get("event") not in self.EVENTS + ("*",):
+            return f"event must be one of {', '.join(self.EVENTS)} or *"
+        if sum(kind in hook for kind in self.KINDS) != 1:
+            return "needs exactly one of shell, python or http"
+        if "python" in hook and ":" not in str(hook["python"]):
+            return "python hooks are written module:function"
+        return None
+
+    def attach(self, engine):
+        """Queue hooks for engine events; only events that have hooks are subscribed"""
+        def payload(event, mode, next_mode):
+            return {"event": event, "mode": mode, "next_mode": next_mode,
+                    "pomodoro_count": engine.timer.pomodoro_count, "status": engine.status()}
+
+        handlers = {
+            "complete": lambda finished_mode, next_mode, history_saved: payload(
+                "complete", finished_mode, next_mode),
+            "start": lambda: payload("start", engine.timer.mode, engine.next_mode()),
+            "pause": lambda: payload("pause", engine.timer.mode, engine.next_mode()),
+            "mode": lambda mode: payload("mode", mode, engine.next_mode()),
+        }
+        for event, make_payload in handlers.items():
+            if any(hook["event"] in (event, "*") for hook in self.hooks):
+                engine.subscribe(event, lambda *args, make_payload=make_payload: self.fire(make_payload(*args)))
+
+    def fire(self, payload):
+        """Queue every hook for payload["event"]; returns immediately"""
+        hooks = [hook for hook in self.hooks if hook["event"] in (payload["event"], "*")]
+        if not hooks:
+            return
+        with self._has_work:
+            if self._closed:
+                return
+            for hook in hooks:
+                if len(self._pending) >= self.MAX_PENDING:
+                    dropped, _ = self._pending.popleft()
+                    self.stats[dropped["name"]]["dropped"] += 1
+                self._pending.append((hook, payload))
+            self._has_work.notify(len(hooks))
+            while len(self._workers) < min(self.WORKERS, len(self._pending)):
+                worker = threading.Thread(target=self._work, name=f"hooks-{len(self._workers)}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+    def _work(self):
+        while True:
+            with self._has_work:
+                while not self._pending and not self._closed:
+                    self._has_work.wait()
+                if not self._pending:
+                    return  # Closed and drained
+                hook, payload = self._pending.popleft()
+            started = time.perf_counter()
+            try:
+                outcome = self._call(hook, payload)
+            except Exception as e:
+                print(f"Error in hook {hook['name']}: {e}")
+                outcome = "failures"
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._has_work:
+                stats = self.stats[hook["name"]]
+                if outcome == "dropped":
+                    stats["dropped"] += 1
+                    continue
+                stats["runs"] += 1
+                if outcome:
+                    stats[outcome] += 1
+                stats["last_ms"] = round(elapsed_ms, 1)
+                stats["max_ms"] = max(stats["max_ms"], stats["last_ms"])
+                stats["total_ms"] += elapsed_ms
+
+    def _call(self, hook, payload):
+        """Run one hook; returns None, "failures", "timeouts", "abandoned" or "dropped" """
+        timeout = hook.get("timeout", self.DEFAULT_TIMEOUT)
+        if hook["kind"] == "shell":
+            env = dict(os.environ, POMODORO_EVENT=payload["event"], POMODORO_MODE=payload["mode"],
+                       POMODORO_NEXT_MODE=payload["next_mode"], POMODORO_COUNT=str(payload["pomodoro_count"]))
+            try:
+                result = subprocess.run(hook["shell"], shell=True, env=env, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                print(f"Hook {hook['name']} timed out after {timeout}s")
+                return "timeouts"
+            return "failures" if result.returncode else None
+        if hook["kind"] == "http":
+            request = urllib_request.Request(hook["http"], data=json.dumps(payload).encode(),
+                                             headers={"Content-Type": "application/json"}, method="POST")
+            try:
+                with urllib_request.urlopen(request, timeout=timeout) as response:
+                    response.read()
+            except OSError as e:  # URLError wraps connect timeouts
+                if not isinstance(e, TimeoutError) and not isinstance(getattr(e, "reason", None), TimeoutError):
+                    raise
+                print(f"Hook {hook['name']} timed out after {timeout}s")
+                return "timeouts"
+            return None
+
+        function = self._resolve(hook["python"])
+        errors = []
+
+        def run():
+            try:
+                function(payload["event"], payload)
+            except Exception as e:
+                print(f"Error in hook {hook['name']}: {e}")
+                errors.append(e)
+
+        with self._has_work:
+            self._python_calls = [call for call in self._python_calls if call.is_alive()]
+            if len(self._python_calls) >= self.MAX_PYTHON_THREADS:
+                print(f"Hook {hook['name']} dropped: {len(self._python_calls)} Python hooks are still running")
+                return "dropped"
+            call = threading.Thread(target=run, name=f"hook {hook['name']}", daemon=True)
+            self._python_calls.append(call)  # Claimed before another worker can check the cap
+            call.start()
+        call.join(timeout)
+        if call.is_alive():
+            print(f"Hook {hook['name']} timed out after {timeout}s; leaving it running")
+            return "abandoned"
+        return "failures" if errors else None
+
+    def _resolve(self, target):
+        if target not in self._functions:
+            module_name, _, attribute = target.partition(":")
+            function = importlib.import_module(module_name)
+            for part in attribute.split("."):
+                function = getattr(function, part)
+            self._functions[target] = function
+        return self._functions[target]
+
+    def snapshot(self):
+        """Copy of the per-hook stats with the mean latency, for the metrics command"""
+        with self._has_work:
+            return {name: dict(stats, mean_ms=round(stats["total_ms"] / stats["runs"], 1) if stats["runs"] else None,
+                               total_ms=round(stats["total_ms"], 1))
+                    for name, stats in self.stats.items()}
+
+    @property
+    def python_threads(self):
+        """Python hook threads still alive, abandoned ones included"""
+        with self._has_work:
+            return sum(call.is_alive() for call in self._python_calls)
+
+    def close(self, timeout=5.0):
+        """Let queued hooks finish for up to timeout seconds; returns False if some were cut off"""
+        with self._has_work:
+            self._closed = True
+            self._has_work.notify_all()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        return not any(worker.is_alive() for worker in self._workers)
+
+
+class HistoryView:
+    """History window that keeps one figure alive and updates its lines in place"""
+
+    DAYS_SHOWN = 30
+
+    def __init__(self, master, store, clock, on_close=None):
+        self.store = store
+        self.clock = clock
+        self._on_close = on_close
+        self.window = tk.Toplevel(master)
+        self.window.title("Pomodoro History")
+        self.window.geometry("800x800")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        dates, counts, total_times, mega_goals = self._columns(store.last(self.DAYS_SHOWN))
+        with plt.style.context("dark_background"):
+            # A bare Figure is not tracked by pyplot, so closing the window frees it
+            self.figure = mpl_figure.Figure(figsize=(10, 8))
+            self.figure.patch.set_facecolor("#2b2b2b")
+            ax1, ax2 = self.figure.subplots(2, 1)
+            self.axes = (ax1, ax2)
+
+            self.count_line, = ax1.plot(dates, counts, color="#1e90ff", marker='o',
+                                        label="Daily Pomodoros", linewidth=2, animated=True)
+            ax1.set_ylabel("Pomodoros", color="#1e90ff")
+            ax1.grid(True, alpha=0.3)
+
+            self.hours_line, = ax2.plot(dates, total_times, color="lime", marker='s',
+                                        label="Hours Worked", linewidth=2, animated=True)
+            self.goal_line, = ax2.plot(dates, mega_goals, color='red', linestyle='--',
+                                       label='Daily Goals', animated=True)
+            ax2.set_ylabel("Hours", color="lime")
+            ax2.grid(True, alpha=0.3)
+
+            for ax in self.axes:
+                ax.set_facecolor("#2b2b2b")
+                ax.tick_params(colors='white')
+                ax.tick_params(axis='x', labelrotation=45)
+                ax.legend(loc='upper left')
+
+            self.stats_text = self.figure.text(
+                0.05, 0.02, self._stats_text(),
+                color='white',
+                fontsize=10,
+                animated=True,
+                bbox=dict(facecolor='#2b2b2b',
+                          edgecolor='white',
+                          alpha=0.7,
+                          pad=10))
+
+        self.figure.tight_layout(rect=[0, 0.16, 1, 0.95])
+        self._animated = (self.count_line, self.hours_line, self.goal_line, self.stats_text)
+        self._background = None
+
+        self.canvas = backend_tkagg.FigureCanvasTkAgg(self.figure, master=self.window)
+        self._draw_cid = self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.draw()
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    @staticmethod
+    def _columns(rows):
+        dates = [item[0] for item in rows]
+        counts = [item[1] for item in rows]
+        total_times = [item[2] / 3600 for item in rows]
+        mega_goals = [item[3] / 3600 for item in rows]
+        return dates, counts, total_times, mega_goals
+
+    def _stats_text(self):
+        stats = HistoryAnalytics(self.store, clock=self.clock).summary(self.DAYS_SHOWN)
+        return (f"Total Pomodoros: {stats['window_pomodoros']}\n"
+                f"Total Hours: {stats['window_hours']:.1f}\n"
+                f"Daily Average: {stats['window_daily_average']:.1f} hours\n"
+                f"7-day Average: {stats['rolling_average_hours'][7]:.1f} hours\n"
+                f"Streak: {stats['current_streak']} days (best {stats['longest_streak']})\n"
+                f"Goal Hit: {stats['goal_hit_ratio']:.0%} of days")
+
+    def _on_draw(self, event):
+        """After a full draw, cache the static background and paint the data on top"""
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        for artist in self._animated:
+            self.figure.draw_artist(artist)
+
+    def update(self):
+        """Update line data in place; blit unless the axis limits had to change"""
+        dates, counts, total_times, mega_goals = self._columns(self.store.last(self.DAYS_SHOWN))
+        self.count_line.set_data(dates, counts)
+        self.hours_line.set_data(dates, total_times)
+        self.goal_line.set_data(dates, mega_goals)
+        self.stats_text.set_text(self._stats_text())
+
+        limits_changed = False
+        for ax in self.axes:
+            old_limits = (ax.get_xlim(), ax.get_ylim())
+            ax.relim()
+            ax.autoscale_view()
+            limits_changed |= (ax.get_xlim(), ax.get_ylim()) != old_limits
+
+        if limits_changed or self._background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        for artist in self._animated:
+            self.figure.draw_artist(artist)
+        self.canvas.blit(self.figure.bbox)
+
+    def close(self):
+        """Destroy the window and release the figure"""
+        self.canvas.mpl_disconnect(self._draw_cid)
+        self.figure.clear()
+        self._background = None
+        self.window.destroy()
+        if self._on_close:
+            self._on_close()
+
+
+class NoiseGenerator:
+    """Endless rain, white, pink or brown noise produced in chunks with vectorized NumPy.
+
+    Filter state is carried from chunk to chunk, so consecutive chunks join
+    without clicks and memory use does not depend on how long it runs.
+    """
+
+    COLOURS = ("rain", "white", "pink", "brown")
+    BLOCK = 512  # Samples per vectorized filter block
+    PINK_POLES = ((0.99765, 0.0990460), (0.96300, 0.2965164), (0.57000, 1.0526913))  # Kellet's economy filter
+
+    def __init__(self, colour="rain", intensity=0.5, rate=44100, seed=None):
+        if colour not in self.COLOURS:
+            raise ValueError(f"Unknown noise colour: {colour}")
+        self.colour = colour
+        self.intensity = min(1.0, max(0.0, intensity))
+        self.rate = rate
+        self._rng = np.random.default_rng(seed)
+        self._state = {}  # Filter name -> last output sample
+
+    def _lowpass(self, name, x, pole):
+        """y[n] = pole * y[n-1] + x[n], solved per block as a scaled cumulative sum"""
+        # Keep pole ** -block within float range for the fast-decaying poles
+        block = min(self.BLOCK, int(math.log(1e-30) / math.log(pole)))
+        powers = pole ** np.arange(1, block + 1)
+        y = np.empty_like(x)
+        state = self._state.get(name, 0.0)
+        for start in range(0, len(x), block):
+            chunk = x[start:start + block]
+            scale = powers[:len(chunk)]
+            y[start:start + block] = scale * (state + np.cumsum(chunk / scale))
+            state = y[start + len(chunk) - 1]
+        self._state[name] = state
+        return y
+
+    def _pink(self, white):
+        pink = white * 0.1848
+        for index, (pole, gain) in enumerate(self.PINK_POLES):
+            pink += self._lowpass(f"pink{index}", white * gain, pole)
+        return pink * 0.08
+
+    def chunk(self, samples):
+        """Next `samples` mono samples as float32 in [-1, 1]"""
+        white = self._rng.standard_normal(samples)
+        if self.colour == "rain":
+            # A pink hiss plus short noise bursts for drops; intensity sets the drop rate
+            drops_per_second = 150 + 1500 * self.intensity
+            hits = (self._rng.random(samples) < drops_per_second / self.rate) * self._rng.uniform(0.2, 1.0, samples)
+            envelope = self._lowpass("drops", hits, 0.993)
+            out = self._pink(white) * 0.375 + envelope * white * 0.0375
+        else:
+            if self.colour == "white":
+                out = white * 0.12
+            elif self.colour == "pink":
+                out = self._pink(white)
+            else:
+                out = self._lowpass("brown", white, 0.998) * 0.012
+            out *= 0.4 + 0.6 * self.intensity
+        return np.clip(out, -1.0, 1.0).astype(np.float32)
+
+
+class NoiseStream:
+    """Keeps a mixer channel fed with generated chunks through its one-slot queue"""
+
+    CHUNK_SECONDS = 0.5
+
+    def __init__(self, pygame_module, generator, scheduler):
+        self.pygame = pygame_module
+        self.generator = generator
+        self.scheduler = scheduler
+        self.channel = None
+        self._top_up_handle = None
+
+    @property
+    def running(self):
+        return self.channel is not None
+
+    def start(self, channel, volume=1.0, fade_ms=0):
+        self.channel = channel
+        self.channel.set_volume(volume)
+        self.channel.play(self._next_sound(), fade_ms=fade_ms)
+        self.channel.queue(self._next_sound())
+        self._schedule_top_up()
+
+    def stop(self, fade_ms=0):
+        if self._top_up_handle is not None:
+            self.scheduler.cancel(self._top_up_handle)
+            self._top_up_handle = None
+        if self.channel is not None:
+            if fade_ms:
+                self.channel.fadeout(fade_ms)
+            else:
+                self.channel.stop()
+            self.channel = None
+
+    def set_volume(self, volume):
+        if self.channel is not None:
+            self.channel.set_volume(volume)
+
+    def _schedule_top_up(self):
+        # Checking twice per chunk refills the queue well before the queued chunk starts
+        self._top_up_handle = self.scheduler.call_later(self.CHUNK_SECONDS / 2, self._top_up)
+
+    def _top_up(self):
+        self._top_up_handle = None
+        if self.channel is None:
+            return
+        if not self.channel.get_busy():
+            self.channel.play(self._next_sound())  # Starved, e.g. after the process was suspended
+        if self.channel.get_queue() is None:
+            self.channel.queue(self._next_sound())
+        self._schedule_top_up()
+
+    def _next_sound(self):
+        rate, _, channels = self.pygame.mixer.get_init()
+        self.generator.rate = rate
+        pcm = (self.generator.chunk(int(rate * self.CHUNK_SECONDS)) * 32767).astype(np.int16)
+        if channels > 1:
+            pcm = np.repeat(pcm[:, None], channels, axis=1)
+        return self.pygame.sndarray.make_sound(np.ascontiguousarray(pcm))
+
+
+class SoundCache:
+    """Sounds decoded once into memory, reloaded only when the file's mtime or size changes"""
+
+    def __init__(self, mixer):
+        self.mixer = mixer
+        self._sounds = {}  # Path -> ((mtime_ns, size), Sound)
+
+    def get(self, path):
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._sounds.get(path)
+        if cached is None or cached[0] != key:
+            cached = self._sounds[path] = (key, self.mixer.Sound(path))
+        return cached[1]
+
+    def clear(self):
+        self._sounds.clear()
+
+
+class AmbientMixer:
+    """Layers ambient tracks on pygame mixer channels and plays chimes on a reserved channel.
+
+    A track plays a sound file (decoded once through SoundCache) or, when its
+    source is a NoiseGenerator colour, a generated stream. Each track has its
+    own volume, scaled by the master volume.
+    """
+
+    TRACKS = ("rain", "cafe", "fan")
+    DEFAULT_VOLUMES = {"rain": 0.8, "cafe": 0.0, "fan": 0.0}
+    DEFAULT_SOURCES = {"cafe": "", "fan": "brown"}  # Rain uses rain_sound_path or the noise colour
+    CHANNELS = 16
+    CHIME_CHANNEL = 0
+    CHIMES = ("success", "info", "warning", "error")
+
+    def __init__(self, pygame_module, scheduler, fade_ms=400):
+        self.pygame = pygame_module
+        self.scheduler = scheduler
+        self.fade_ms = fade_ms
+        self.cache = SoundCache(pygame_module.mixer)
+        self.master_volume = 1.0
+        pygame_module.mixer.set_num_channels(self.CHANNELS)
+        pygame_module.mixer.set_reserved(self.CHIME_CHANNEL + 1)  # Tracks and streams never take it
+        self.chime_channel = pygame_module.mixer.Channel(self.CHIME_CHANNEL)
+        # find_channel() ignores set_reserved(), so streams pick from these instead
+        self._stream_channels = [pygame_module.mixer.Channel(index)
+                                 for index in range(self.CHIME_CHANNEL + 1, self.CHANNELS)]
+        self._players = {}  # Track name -> (Channel or NoiseStream, volume)
+        for kind in self.CHIMES:
+            safe_operation(lambda: self._chime_sound(kind), f"Error loading {kind} chime")
+
+    @property
+    def playing(self):
+        return bool(self._players)
+
+    def play(self, name, source, volume, intensity=0.5):
+        """Start a track from a sound file path or a noise colour, fading in"""
+        self.stop(name)
+        if source in NoiseGenerator.COLOURS:
+            player = NoiseStream(self.pygame, NoiseGenerator(source, intensity), self.scheduler)
+            player.start(self._free_channel(), volume * self.master_volume, fade_ms=self.fade_ms)
+        else:
+            # Decoded once and looped sample-accurately, so restarts after each phase are instant
+            player = self.cache.get(source).play(loops=-1, fade_ms=self.fade_ms)
+            if player is None:
+                raise RuntimeError("no free mixer channel")
+            player.set_volume(volume * self.master_volume)
+        self._players[name] = (player, volume)
+
+    def _free_channel(self):
+        """An idle channel above the chime channel that no stream holds"""
+        held = [player.channel for player, _ in self._players.values() if isinstance(player, NoiseStream)]
+        for channel in self._stream_channels:
+            if not channel.get_busy() and not any(channel is other for other in held):
+                return channel
+        raise RuntimeError("no free mixer channel")
+
+    def stop(self, name=None):
+        """Fade out one track, or all of them"""
+        for track in ([name] if name else list(self._players)):
+            player, _ = self._players.pop(track, (None, 0))
+            if isinstance(player, NoiseStream):
+                player.stop(self.fade_ms)
+            elif player is not None:
+                player.fadeout(self.fade_ms)
+
+    def set_volume(self, name, volume):
+        if name in self._players:
+            player, _ = self._players[name]
+            player.set_volume(volume * self.master_volume)
+            self._players[name] = (player, volume)
+
+    def set_master_volume(self, volume):
+        self.master_volume = volume
+        for name, (_, track_volume) in list(self._players.items()):
+            self.set_volume(name, track_volume)
+
+    def _chime_sound(self, kind):
+        return self.cache.get(str(chime.current_theme_dir().joinpath(f"{kind}.wav")))
+
+    def play_chime(self, kind):
+        """Play one of the chime theme's sounds from memory, cutting off the previous chime"""
+        sound = self._chime_sound(kind)
+        sound.set_volume(self.master_volume)
+        self.chime_channel.play(sound)
+
+
+class AudioWarmup:
+    """Imports pygame, opens the mixer and builds the AmbientMixer on a background thread.
+
+    Tk may only be touched from its own thread, so the result is collected by
+    polling every POLL_SECONDS while the warm-up runs (and never after it);
+    on_ready(mixer) or on_error(exception) is then called there exactly once.
+    """
+
+    POLL_SECONDS = 0.05
+
+    def __init__(self, scheduler, on_ready, on_error):
+        self.scheduler = scheduler
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self._thread = None
+        self._result = None  # (mixer, exception) once the thread has finished
+        self._poll_handle = None
+        self.done = False
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="audio-warmup", daemon=True)
+        self._thread.start()
+        self._poll_handle = self.scheduler.call_later(self.POLL_SECONDS, self._poll)
+
+    def _run(self):
         try:
-            with open("pomodoro_history.json", "r") as f:
-                data = json.load(f)
-                processed_data = []
-                today = datetime.date.today().isoformat()
-                
-                for entry in data:
-                    if len(entry) == 3:  # Format: [date, count, time]
-                        d, count, time_value = entry
-                        mega_goal = self.mega_goal  # Use current mega goal if not stored
-                    else:  # New format: [date, count, time, mega_goal]
-                        d, count, time_value, mega_goal = entry
-                        
-                    if d == today:
-                        self._daily_time = time_value
-                    
-                    processed_data.append((
-                        datetime.date.fromisoformat(d),
-                        count,
-                        time_value,
-                        mega_goal
-                    ))
-                
-                return deque(processed_data)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return deque()
+            module = pygame._import()
+            module.mixer.init()
+            self._result = (AmbientMixer(module, self.scheduler), None)
         except Exception as e:
-            print(f"Error loading history: {e}")
-            return deque()
+            self._result = (None, e)
 
-    def save_historical_data(self):
-        """Optimized historical data saving with error handling"""
-        try:
-            # Keep original mega_goals when saving history
-            data = [(d.isoformat(), count, total_time, mega_goal) 
-                    for d, count, total_time, mega_goal in self.historical_data]
-            with open("pomodoro_history.json", "w") as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            print(f"Error saving history: {e}")
-            return False
-        return True
+    def _poll(self):
+        self._poll_handle = None
+        if self._thread.is_alive():
+            self._poll_handle = self.scheduler.call_later(self.POLL_SECONDS, self._poll)
+            return
+        self._deliver()
+
+    def wait(self, timeout=None):
+        """Block until the warm-up finishes and deliver its result now (for soak and bench runs)"""
+        self.start()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            if self._poll_handle is not None:
+                self.scheduler.cancel(self._poll_handle)
+                self._poll_handle = None
+            self._deliver()
+        return self.done
+
+    def _deliver(self):
+        if self.done:
+            return
+        self.done = True
+        mixer, error = self._result
+        if error is None:
+            self.on_ready(mixer)
+        else:
+            self.on_error(error)
 
-    def save_settings(self):
-        settings = {
-            "pomodoro": self.pomodoro_time // 60,
-            "short_break": self.short_break_time // 60,
-            "long_break": self.long_break_time // 60,
-            "mega_goal": self.mega_goal // 3600,
-            "auto_switch": self.auto_switch,
-            "sound_enabled": self.sound_enabled,
-            "rain_sound_path": self.rain_sound_path  # Add this line
-        }
-        with open("settings.json", "w") as f:
-            json.dump(settings, f)
 
-    def update_daily_time(self, seconds):
-        """Atomic update of daily time"""
-        if seconds <= 0:
-            return False
-        try:
-            self._daily_time += seconds
-            return self.save_historical_data()
-        except Exception:
-            return False
+class SessionDots:
+    """Daily session markers drawn as items on one Canvas.
 
+    Only markers whose state changed are recoloured, so counting a session
+    costs one item update however large the goal is; markers shrink and
+    wrap into more columns to keep big goals within a few rows.
+    """
+
+    DONE, TODO = "lime", "gray"
+    STEPS = (14, 10, 7, 5, 4, 3)  # Marker pitch in pixels, tried largest first
+    MAX_ROWS = 4
+    MAX_WIDTH = 240
 
-class PomodoroTimerGUI:
     def __init__(self, master):
+        background = ttk.Style().lookup("TFrame", "background") or None
+        self.canvas = tk.Canvas(master, width=1, height=1, highlightthickness=0, background=background)
+        self._items = []
+        self._done = 0
+        self._step = self.STEPS[0]
+        self._per_row = 8
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+    def update(self, done, total):
+        done = min(done, total)
+        if total != len(self._items):
+            self._resize(total)
+        low, high = sorted((self._done, done))
+        for index in range(low, high):
+            self.canvas.itemconfigure(self._items[index], fill=self.DONE if index < done else self.TODO)
+        self._done = done
+
+    def _layout(self, total):
+        """Largest pitch whose layout fits in MAX_ROWS rows"""
+        for step in self.STEPS:
+            per_row = 8 if step == self.STEPS[0] else self.MAX_WIDTH // step
+            if math.ceil(total / per_row) <= self.MAX_ROWS:
+                return step, per_row
+        return step, per_row
+
+    def _coords(self, index):
+        row, column = divmod(index, self._per_row)
+        size = max(2, self._step - 4)
+        x, y = column * self._step + 2, row * self._step + 2
+        return x, y, x + size, y + size
+
+    def _resize(self, total):
+        """Add or delete markers for a new goal, moving the rest only if the pitch changed"""
+        layout = self._layout(total)
+        relayout = layout != (self._step, self._per_row)
+        self._step, self._per_row = layout
+        for item in self._items[total:]:
+            self.canvas.delete(item)
+        del self._items[total:]
+        if relayout:
+            for index, item in enumerate(self._items):
+                self.canvas.coords(item, *self._coords(index))
+        for index in range(len(self._items), total):
+            fill = self.DONE if index < self._done else self.TODO
+            self._items.append(self.canvas.create_oval(*self._coords(index), fill=fill, outline=""))
+        self._done = min(self._done, total)
+        columns = min(total, self._per_row)
+        rows = math.ceil(total / self._per_row)
+        self.canvas.configure(width=max(1, columns * self._step), height=max(1, rows * self._step))
+
+
+class PomodoroTimerGUI:
+    def __init__(self, master, clock=None, scheduler=None):
         self.master = master
-        self.timer = PomodoroTimer()
+        self.timer = PomodoroTimer(clock=clock)
+        self.scheduler = scheduler or TkScheduler(master)
         self.auto_switch_var = tk.BooleanVar(value=self.timer.auto_switch)  # Set initial value here
         self.setup_gui()
         self.setup_audio()
@@ -204,86 +2593,194 @@ class PomodoroTimerGUI:
         self.is_user_playsound = False
         self.pygame_initialized = False
         self.pygame = None
-        chime.theme("big-sur")
+        self.mixer = None
+        self._play_requested = False  # Play Sound clicked while the mixer was still warming up
+        self.audio_warmup = AudioWarmup(self.scheduler, self._on_audio_ready, self._on_audio_error)
+
+    def warm_up_audio(self):
+        """Open the mixer in the background; called once the first frame is drawn"""
+        self.audio_warmup.start()
+
+    def _on_audio_ready(self, mixer):
+        self.pygame = mixer.pygame
+        self.mixer = mixer
+        self.mixer.set_master_volume(self.timer.sound_volume)
+        self.pygame_initialized = True
+        if self._play_requested:
+            self._play_requested = False
+            self.play_rain_sound()
 
-    def _load_pygame(self):
-        """Lazy load pygame module"""
-        if not self.pygame_initialized:
-            try:
-                # Suppress pygame startup message
-                original_stdout = sys.stdout
-                sys.stdout = open(os.devnull, "w")
-                
-                # Lazy import pygame
-                self.pygame = importlib.import_module('pygame')
-                self.pygame.mixer.init()
-                
-                sys.stdout = original_stdout
-                self.pygame_initialized = True
-                return True
-            except Exception as e:
-                sys.stdout = original_stdout
-                print(f"Failed to initialize sound system: {e}")
-                messagebox.showerror("Sound Error", "Failed to initialize sound system")
-                return False
-        return True
+    def _on_audio_error(self, error):
+        print(f"Failed to initialize sound system: {error}")
+        if self._play_requested:
+            self._play_requested = False
+            self.play_sound_button.config(text="Play Sound", style="primary.TButton")
+            messagebox.showerror("Sound Error", "Failed to initialize sound system")
 
     def initialize_state(self):
         """Initialize timer state"""
-        self.timer_thread = None
-        self.is_running = False
-        self.is_paused = False
-        self.should_stop = threading.Event()
-        self._display_update_pending = False
-        self._last_display_update = 0
-        self.display_update_interval = 0.5
+        self.engine = TimerEngine(self.timer, self.scheduler, tick_wakeups=False)
+        self.engine.subscribe("start", self._on_start)
+        self.engine.subscribe("resume", self._on_start)
+        self.engine.subscribe("pause", self._on_pause)
+        self.engine.subscribe("tick", self._on_tick)
+        self.engine.subscribe("session", self.update_session_display)
+        self.engine.subscribe("complete", self._on_complete)
+        self.engine.subscribe("mode", self._on_mode)
+        self.engine.subscribe("reset", self._on_reset)
+        self.engine.subscribe("day", self.check_date)
+        self.hooks = HookRunner(self.timer.hooks)
+        self.hooks.attach(self.engine)
+        self.control_server = start_control_server(self.engine, self.timer)
+        if self.control_server:
+            self.control_server.on_activate = self.activate
+            self.control_server.hooks = self.hooks
+        self.notifier = Notifier(self.scheduler, self._show_toast, self._hide_toast,
+                                 desktop_backends() if self.timer.desktop_notifications else ())
+        self._resume_sound_on_switch = False
+        self.history_view = None
+        self._dirty_fields = set()
+        self._render_pending = None
+        self._rendered = {}  # Widget key -> options last passed to configure
+        self._visible = True
+        self._title = None
+        self._title_timer = None
+        self.engine.want_ticks(self)
+        self.master.bind("<Unmap>", lambda event: self._on_map_change(event, False), add="+")
+        self.master.bind("<Map>", lambda event: self._on_map_change(event, True), add="+")
+        self.master.bind("<Visibility>", lambda event: self._on_map_change(
+            event, event.state != "VisibilityFullyObscured"), add="+")
         
         self.check_date()
         self.update_initial_display()
+        # The first frame renders from the snapshot; history and NumPy load behind it
+        self.master.after_idle(lambda: self.timer.preload_history(analytics=True))
+        self.master.after_idle(self.warm_up_audio)
         self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+    def activate(self, argv=()):
+        """Bring the window to the front for a second launch, applying its --mode"""
+        args, _ = build_parser().parse_known_args(argv)
+        if args.mode:
+            self.engine.set_mode(args.mode)
+        self.master.deiconify()
+        self.master.lift()
+        self.master.attributes("-topmost", True)
+        self.master.after_idle(self.master.attributes, "-topmost", False)
+        self.master.focus_force()
+
     def update_initial_display(self):
         """Update all displays with saved session data on app startup"""
-        # Update pomodoro count label
-        self.pomodoro_count_label.config(text=f"Pomodoros: {self.timer.pomodoro_count}")
-        
-        # Update total time label
-        formatted_time = time.strftime("%H:%M:%S", time.gmtime(self.timer.total_pomodoro_time))
-        self.total_time_label.config(text=f"Total Time: {formatted_time}")
-        
         # Update mode
         self.mode_var.set(self.timer.mode)
-        
-        # Update session displays
-        total_sessions = int((self.timer.mega_goal / 3600) * 2)
+        self.request_render("time", "totals", "sessions")
+
+        # Update auto switch state from session state
+        self.auto_switch_var.set(self.timer.auto_switch)
+
+    def request_render(self, *fields):
+        """Mark display fields dirty ("time", "totals", "sessions"); all dirty
+        fields are rendered together in a single idle callback"""
+        self._dirty_fields.update(fields)
+        if not self._visible:
+            self._update_hidden_title()  # Redraw on the way back instead
+            return
+        if self._render_pending is None:
+            self._render_pending = self.master.after_idle(self._render)
+
+    def _on_map_change(self, event, visible):
+        """Suspend redraws and per-second ticks while the window is iconified or covered"""
+        if event.widget is not self.master or visible == self._visible:
+            return
+        self._visible = visible
+        self.engine.want_ticks(self, visible)  # Resuming ticks settles the skipped seconds
+        if visible:
+            self._cancel_title_timer()
+            self._set_title("Pomodoro Timer")
+            self.request_render("time", "totals", "sessions")
+        else:
+            self._update_hidden_title()
+
+    def _update_hidden_title(self):
+        """Show the minutes left in the window title, waking up only when that minute changes"""
+        self._cancel_title_timer()
+        remaining = self.engine.remaining_seconds()
+        minutes = math.ceil(remaining / 60)
+        if not self.engine.is_running:
+            self._set_title("Pomodoro Timer")
+            return
+        if self.engine.is_paused:
+            self._set_title(f"Paused {minutes}m {self.timer.mode} - Pomodoro Timer")
+            return
+        self._set_title(f"{minutes}m {self.timer.mode} - Pomodoro Timer")
+        if minutes > 0:
+            self._title_timer = self.scheduler.call_later(remaining - (minutes - 1) * 60, self._on_title_timer)
+
+    def _on_title_timer(self):
+        self._title_timer = None
+        self._update_hidden_title()
+
+    def _cancel_title_timer(self):
+        if self._title_timer is not None:
+            self.scheduler.cancel(self._title_timer)
+            self._title_timer = None
+
+    def _set_title(self, title):
+        if title != self._title:
+            self._title = title
+            self.master.title(title)
+
+    def _render(self):
+        self._render_pending = None
+        dirty, self._dirty_fields = self._dirty_fields, set()
+        if not self.master.winfo_exists():
+            return
+        try:
+            if "time" in dirty:
+                current_time = self.timer.current_time
+                self._configure_if_changed("timer", self.timer_label, text=self.format_time(current_time))
+                progress = (1 - current_time / max(1, self.timer.get_mode_time())) * 100
+                self._configure_if_changed("progress", self.progress_bar, value=round(progress, 1))
+
+            if "totals" in dirty:
+                formatted_time = time.strftime("%H:%M:%S", time.gmtime(self.timer.total_pomodoro_time))
+                self._configure_if_changed("total", self.total_time_label, text=f"Total Time: {formatted_time}")
+                self._configure_if_changed("count", self.pomodoro_count_label,
+                                           text=f"Pomodoros: {self.timer.pomodoro_count}")
+
+            if "sessions" in dirty:
+                self._render_sessions()
+        except tk.TclError:
+            pass
+
+    def _configure_if_changed(self, key, widget, **options):
+        """Configure widget only if these options differ from what was last rendered"""
+        if self._rendered.get(key) == options:
+            return
+        self._rendered[key] = options
+        widget.configure(**options)
+
+    def _render_sessions(self):
         sessions_done = self.timer.sessions_completed
-        
-        # Update session label and progress
-        self.session_label.config(
+        total_sessions = max(1, int((self.timer.mega_goal / 3600) * 2))  # 2 sessions per hour
+
+        # Update session counter and progress bar
+        self._configure_if_changed(
+            "sessions", self.session_label,
             text=f"Sessions: {sessions_done}/{total_sessions}",
             foreground="lime" if sessions_done >= total_sessions else "white"
         )
-        self.session_progress["value"] = min(100, (sessions_done / total_sessions) * 100)
-        
-        # Update progress dots
-        for i, dot in enumerate(self.progress_dots):
-            if i < total_sessions:
-                dot.configure(
-                    foreground="lime" if i < sessions_done else "gray",
-                    text="●"
-                )
-            else:
-                dot.configure(text=" ")
+        self._configure_if_changed("session_progress", self.session_progress,
+                                   value=min(100, (sessions_done / total_sessions) * 100))
 
-        # Update auto switch state from session state
-        self.auto_switch_var.set(self.timer.auto_switch)
+        self.session_dots.update(sessions_done, total_sessions)
 
     def setup_gui(self):
 
         self.master.title("Pomodoro Timer")
         self.master.geometry("300x600")  # Increased height from 550 to 600
         self.master.resizable(False, False)
-        self.style = Style(theme="darkly")
+        self.style = ttkbootstrap.Style(theme="darkly")
 
         self.timer_label = ttk.Label(
             self.master,
@@ -370,50 +2867,64 @@ class PomodoroTimerGUI:
         )
         self.session_label.pack(pady=2)
 
-        # Add progress dots frame
-        dots_frame = ttk.Frame(session_frame)
-        dots_frame.pack(pady=2)
-        
-        # Create progress dots
-        self.progress_dots = []
-        max_dots_per_row = 8
-        for i in range(16):
-            if i % max_dots_per_row == 0:
-                row_frame = ttk.Frame(dots_frame)
-                row_frame.pack()
-            
-            dot = ttk.Label(
-                row_frame,
-                text="●",
-                font=("Helvetica", 8),
-                foreground="gray"
-            )
-            dot.pack(side="left", padx=1)
-            self.progress_dots.append(dot)
+        # One marker per session, sized to the daily goal on the first render
+        self.session_dots = SessionDots(session_frame)
+        self.session_dots.pack(pady=2)
+
+        # Notification toast, placed over the top of the window while showing
+        self.toast = ttk.Label(
+            self.master,
+            style="inverse-info.TLabel",
+            font=("Helvetica", 11),
+            padding=10,
+            justify="center"
+        )
+        self.toast.bind("<Button-1>", lambda event: self.notifier.dismiss())
 
     def toggle_rain_sound(self):
-        if self.is_playing:
+        if self.is_playing or self._play_requested:
             self.is_user_playsound = False
             self.stop_rain_sound()
         else:
             self.is_user_playsound = True
             self.play_rain_sound()
 
-    def play_rain_sound(self):
-        try:
-            if not self.rain_sound:
-                messagebox.showwarning("Sound Disabled", "Rain sound feature is disabled. No sound file was provided during installation.")
-                return
+    def _track_source(self, name):
+        """File path or noise colour for a track, or None if it has nothing to play"""
+        if name == "rain":
+            if self.rain_sound and os.path.exists(self.rain_sound):
+                return self.rain_sound
+            # No sound file: synthesize the configured noise instead
+            if self.rain_sound:
+                print(f"Rain sound file not found: {self.rain_sound}; using generated {self.timer.noise_colour}")
+            return self.timer.noise_colour
+        source = self.timer.track_sources.get(name, "")
+        if source in NoiseGenerator.COLOURS or (source and os.path.exists(source)):
+            return source
+        if source:
+            print(f"Sound file for {name} not found: {source}")
+        return None
 
-            if not os.path.exists(self.rain_sound):
-                messagebox.showerror("File Error", "Rain sound file not found")
+    def play_rain_sound(self):
+        """Start every ambient track whose volume is above zero, or once the mixer is ready"""
+        if not self.pygame_initialized:
+            if self.audio_warmup.done:  # Warm-up failed and was already reported
+                messagebox.showerror("Sound Error", "Failed to initialize sound system")
                 return
+            self._play_requested = True
+            self.play_sound_button.config(text="Starting...", style="danger.TButton")
+            self.warm_up_audio()
+            return
+        try:
 
-            if not self._load_pygame():
+            for name in AmbientMixer.TRACKS:
+                volume = self.timer.track_volumes.get(name, 0)
+                source = self._track_source(name) if volume > 0 else None
+                if source:
+                    self.mixer.play(name, source, volume, self.timer.noise_intensity)
+            if not self.mixer.playing:
+                messagebox.showwarning("Sound", "All ambient tracks are muted. Raise a track volume in Settings.")
                 return
-
-            self.pygame.mixer.music.load(self.rain_sound)
-            self.pygame.mixer.music.play(-1)
             self.is_playing = True
             self.play_sound_button.config(text="Stop Sound", style="danger.TButton")
         except Exception as e:
@@ -423,289 +2934,137 @@ class PomodoroTimerGUI:
 
     def stop_rain_sound(self):
         """Stop the rain sound playback"""
+        if self._play_requested:
+            self._play_requested = False
+            self.play_sound_button.config(text="Play Sound", style="primary.TButton")
         if self.pygame_initialized and self.is_playing:
             try:
-                self.pygame.mixer.music.stop()
+                self.mixer.stop()
                 self.is_playing = False
                 self.play_sound_button.config(text="Play Sound", style="primary.TButton")
             except Exception as e:
                 print(f"Error stopping sound: {e}")
 
     def change_volume(self, value):
+        """Set the master volume for ambient tracks and chimes"""
+        self.timer.sound_volume = float(value) / 100
+        if self.mixer is not None:
+            self.mixer.set_master_volume(self.timer.sound_volume)
+        self.timer.save_settings()
+
+    def play_chime(self, kind):
+        """Play a chime from memory on the mixer's reserved channel, or through chime
+        while the mixer is warming up or unavailable"""
+        self.warm_up_audio()
         if self.pygame_initialized:
-            volume = float(value) / 100
-            self.timer.sound_volume = volume
-            self.pygame.mixer.music.set_volume(volume)
-            self.timer.save_settings()
+            try:
+                self.mixer.play_chime(kind)
+                return
+            except Exception as e:
+                print(f"Error playing chime: {e}")
+        getattr(chime, kind)()
+
+    @property
+    def is_running(self):
+        return self.engine.is_running
+
+    @property
+    def is_paused(self):
+        return self.engine.is_paused
 
     def toggle_timer(self):
-        if self.is_running:
-            if self.is_paused:
-                self.is_paused = False
-                chime.info()
-                self.start_button.config(text="Pause")
-            else:
-                self.is_paused = True
-                chime.info()
-                self.start_button.config(text="Resume")
-        else:
-            # Reset timer if it's at 0
-            if self.timer.current_time <= 0:
-                self.timer.current_time = self.timer.get_mode_time()
-                self.update_display()
-            
-            self.is_running = True
-            self.is_paused = False
-            self.should_stop.clear()  # Clear stop flag
-            chime.info()
-            self.start_button.config(text="Pause")
-            self.timer_thread = threading.Thread(target=self.run_timer)
-            self.timer_thread.start()
-        self.timer.save_state()
+        self.play_chime("info")
+        self.engine.toggle()
 
-    def run_timer(self):
-        """Fixed timer with consistent speed and proper time tracking"""
-        target_interval = 1.0
-        last_tick = time.time()
-        
-        while not self.should_stop.is_set() and self.timer.current_time > 0:  # Changed back to > 0
-            current_time = time.time()
-            
-            if self.is_paused:
-                last_tick = current_time
-                time.sleep(0.1)
-                continue
-            
-            elapsed = current_time - last_tick
-            if elapsed >= target_interval:
-                # Update timer first
-                self.timer.current_time = max(0, self.timer.current_time - 1)
-                self.master.after(0, self.update_display)
-                
-                # Handle Pomodoro mode updates
-                if self.timer.mode == "Pomodoro":
-                    self.timer.total_pomodoro_time += 1
-                    self.master.after(0, self.update_total_time_label)
-                    
-                    # Check for session completion
-                    if self.timer.total_pomodoro_time % 1800 == 0:
-                        self.timer.sessions_completed += 1
-                        self.master.after(0, self.update_session_display)
-                
-                # Check completion after updates
-                if self.timer.current_time == 0:  # Changed to exact equality
-                    self.master.after(0, self._handle_completion)
-                    break
-                
-                last_tick = current_time
-            
-            sleep_time = max(0.01, min(0.1, target_interval - (time.time() - current_time)))
-            time.sleep(sleep_time)
+    def _on_start(self):
+        self.start_button.config(text="Pause")
+        self.request_render("time")
 
-    def _handle_completion(self):
-        """Internal method to handle timer completion with proper order"""
-        if not self.master.winfo_exists():
-            return
-            
-        # Stop timer immediately
-        self.is_running = False
-        self.should_stop.set()
-        
-        # Save current state
-        was_playing = self.is_playing
-        current_mode = self.timer.mode
-        
-        # Handle sound
-        if self.is_playing:
-            self.stop_rain_sound()
-        chime.success()
-        
-        # Update pomodoro count first if needed
-        if current_mode == "Pomodoro":
-            self.update_pomodoro_completion()
-        
-        # Show message if not auto-switching
-        if not self.timer.auto_switch:
-            self.show_completion_message()
-        
-        # Switch mode last
-        next_mode = self.get_next_mode()
-        def switch_with_state():
-            if self.master.winfo_exists():
-                self.switch_mode(next_mode)
-                if was_playing or self.is_user_playsound:
-                    self.play_rain_sound()
-        
-        self.master.after(500, switch_with_state)
-        self.timer.save_state()
+    def _on_pause(self):
+        self.start_button.config(text="Resume")
+        self.request_render("time")
 
-    def timer_completed(self):
-        """Streamlined timer completion handler"""
+    def _on_tick(self):
+        if self.timer.mode == "Pomodoro":
+            self.request_render("time", "totals")
+        else:
+            self.request_render("time")
+
+    def _on_complete(self, finished_mode, next_mode, history_saved):
+        """Sound, labels and message for a finished phase; the engine then switches modes"""
         if not self.master.winfo_exists():
             return
-            
-        self.is_running = False
-        was_playing = self.is_playing
-        
-        # Stop sound and play completion chime
+
+        # Resume the rain sound once the next phase has started
+        self._resume_sound_on_switch = self.is_playing or self.is_user_playsound
         if self.is_playing:
             self.stop_rain_sound()
-        chime.success()
-        
-        # Show completion message before mode switch if not auto-switching
-        if not self.timer.auto_switch:
-            self.show_completion_message()
-            
-        # Get next mode
-        next_mode = self.get_next_mode()
-        
-        # Update pomodoro count if needed
-        if self.timer.mode == "Pomodoro":
-            self.update_pomodoro_completion()
-        
-        # Switch mode after a short delay
-        def switch_with_state():
-            if self.master.winfo_exists():  # Check if window still exists
-                self.switch_mode(next_mode)
-                if was_playing or self.is_user_playsound:
-                    self.play_rain_sound()
-        
-        self.master.after(500, switch_with_state)
-        self.timer.save_state()
+        self.play_chime("success")
+
+        if finished_mode == "Pomodoro":
+            self.update_pomodoro_completion(history_saved)
+
+        # Toasts don't block the loop, so the message is shown even while auto-switching
+        self.show_completion_message(finished_mode)
+
+    def _on_mode(self, mode):
+        self.mode_var.set(mode)
+        self.request_render("time")
+        if self._resume_sound_on_switch:
+            self._resume_sound_on_switch = False
+            self.play_rain_sound()
+
+    def _on_reset(self):
+        self.start_button.config(text="Start")
+        self.request_render("time")
 
     def get_next_mode(self):
         """Determine next timer mode"""
-        if self.timer.mode == "Pomodoro":
-            return "Long Break" if self.timer.pomodoro_count % 4 == 0 else "Short Break"
-        return "Pomodoro"
+        return self.engine.next_mode()
 
-    def show_completion_message(self):
+    def show_completion_message(self, finished_mode=None):
         """Show appropriate completion message"""
-        if self.timer.mode == "Pomodoro":
-            messagebox.showinfo("Pomodoro Complete", "Well done! Time for a break!")
+        if (finished_mode or self.timer.mode) == "Pomodoro":
+            self.notifier.notify("Pomodoro Complete", "Well done! Time for a break!")
         else:
-            messagebox.showinfo("Break Complete", "Break finished! Time to work!")
+            self.notifier.notify("Break Complete", "Break finished! Time to work!")
 
-    def update_pomodoro_completion(self):
-        """Update pomodoro completion state"""
-        self.timer.pomodoro_count += 1
-        self.pomodoro_count_label.config(text=f"Pomodoros: {self.timer.pomodoro_count}")
-        self.update_historical_data()
-        self.timer.save_state()
+    def _show_toast(self, title, message):
+        self.toast.configure(text=f"{title}\n{message}")
+        self.toast.place(relx=0.5, y=10, anchor="n")
+        self.toast.lift()
+
+    def _hide_toast(self):
+        self.toast.place_forget()
+
+    def update_pomodoro_completion(self, history_saved=True):
+        """Refresh the widgets after the engine counted a finished pomodoro"""
+        self.request_render("totals")
+        if history_saved:
+            self.refresh_history_view()
+        else:
+            self.notifier.notify("Error", "Failed to update history")
 
     def update_session_display(self):
-        """Update session display independently"""
-        sessions_done = self.timer.sessions_completed
-        total_sessions = int((self.timer.mega_goal / 3600) * 2)  # 2 sessions per hour
-        
-        # Update session counter and progress bar
-        self.session_label.config(
-            text=f"Sessions: {sessions_done}/{total_sessions}",
-            foreground="lime" if sessions_done >= total_sessions else "white"
-        )
-        self.session_progress["value"] = min(100, (sessions_done / total_sessions) * 100)
-        
-        # Update progress dots
-        for i, dot in enumerate(self.progress_dots):
-            if i < total_sessions:
-                dot.configure(
-                    foreground="lime" if i < sessions_done else "gray",
-                    text="●"
-                )
-            else:
-                dot.configure(text=" ")
+        """Redraw the session counter, bar and dots on the next render"""
+        self.request_render("sessions")
 
     def switch_mode(self, new_mode):
-        """Enhanced mode switching with proper state management"""
-        # Stop current timer thread
-        self.is_running = False
-        self.should_stop.set()
-        if self.timer_thread and self.timer_thread.is_alive():
-            self.timer_thread.join(timeout=1)
-        
-        # Update mode and reset state
-        self.timer.mode = new_mode
-        self.mode_var.set(new_mode)
-        self.timer.current_time = self.timer.get_mode_time()
-        self.should_stop.clear()
-        
-        # Update display before starting new timer
-        self.update_display()
-        
-        # Start new timer thread
-        self.is_running = True
-        self.is_paused = False
-        self.start_button.config(text="Pause")
-        self.timer_thread = threading.Thread(target=self.run_timer)
-        self.timer_thread.start()
+        """Switch to new_mode and start its countdown"""
+        self.engine.switch_mode(new_mode)
 
     def reset_timer(self):
-        """Enhanced reset with proper thread cleanup and immediate display update"""
-        # Store the current total time and session state before reset
-        current_total = self.timer.total_pomodoro_time
-        current_sessions = self.timer.sessions_completed
-        
-        self.is_running = False
-        self.is_paused = False
-        self.should_stop.set()
-        chime.warning()
-        
-        if self.timer_thread and self.timer_thread.is_alive():
-            self.timer_thread.join(timeout=1)
-            
-        self.should_stop.clear()
-        self.timer.current_time = self.timer.get_mode_time()
-        self.start_button.config(text="Start")
-        
-        # Restore the total time and session state
-        self.timer.total_pomodoro_time = current_total
-        self.timer.sessions_completed = current_sessions
-        
-        # Force immediate display update
-        self.timer_label.config(text=self.format_time(self.timer.current_time))
-        self.progress_bar["value"] = 0
-        self.update_display()
-        self.timer.save_state()
+        """Stop the countdown and restore the full time for the current mode"""
+        self.play_chime("warning")
+        self.engine.reset()
 
     def change_mode(self, *args):
-        chime.warning()  # Audio feedback for mode change
-        self.timer.mode = self.mode_var.get()
-        self.reset_timer()
+        self.play_chime("warning")  # Audio feedback for mode change
+        self.engine.set_mode(self.mode_var.get())
 
     def update_display(self):
-        """Modified update_display with improved session tracking"""
-        if self._display_update_pending:
-            return
-        
-        current_time = time.time()
-        if current_time - self._last_display_update < self.display_update_interval:
-            return
-
-        self._display_update_pending = True
-        try:
-            # Cache frequently used values
-            current_time = self.timer.current_time
-            mode_time = self.timer.get_mode_time()
-            
-            # Update main display
-            self.timer_label.config(text=self.format_time(current_time))
-            current_progress = (1 - current_time / mode_time) * 100
-            self.progress_bar["value"] = current_progress
-
-            # Update total time display if in Pomodoro mode
-            if self.timer.mode == "Pomodoro":
-                if not hasattr(self, '_last_total_time') or self._last_total_time != self.timer.total_pomodoro_time:
-                    self._last_total_time = self.timer.total_pomodoro_time
-                    self.update_total_time_label()
-                    
-                    # Check for session completion
-                    if self.timer.total_pomodoro_time > 0 and self.timer.total_pomodoro_time % 1800 == 0:
-                        self.update_session_display()
-
-            self._last_display_update = current_time
-            
-        finally:
-            self._display_update_pending = False
+        """Redraw the countdown and its progress bar on the next render"""
+        self.request_render("time")
 
     def update_progress_bars(self):
         # Update session progress
@@ -714,7 +3073,7 @@ class PomodoroTimerGUI:
 
         # Update mega goal progress
         daily_time = 0
-        today = datetime.date.today()
+        today = self.timer.clock.today()
         if self.timer.historical_data and self.timer.historical_data[-1][0] == today:
             daily_time = self.timer.historical_data[-1][2]
         if self.timer.mode == "Pomodoro":
@@ -722,36 +3081,11 @@ class PomodoroTimerGUI:
         mega_progress = min(100, (daily_time / self.timer.mega_goal) * 100)
         self.mega_goal_progress["value"] = mega_progress
 
-    def update_historical_data(self):
-        today = datetime.date.today()
-        try:
-            if self.timer.historical_data and self.timer.historical_data[-1][0] == today:
-                _, prev_count, prev_time, prev_goal = self.timer.historical_data[-1]
-                self.timer.historical_data[-1] = (
-                    today,
-                    prev_count + 1,
-                    prev_time + self.timer.pomodoro_time,
-                    self.timer.mega_goal
-                )
-            else:
-                self.timer.historical_data.append(
-                    (today, 1, self.timer.pomodoro_time, self.timer.mega_goal)
-                )
-                year_ago = today - datetime.timedelta(days=365)
-                while (self.timer.historical_data and 
-                       self.timer.historical_data[0][0] < year_ago):
-                    self.timer.historical_data.popleft()
-            
-            self.timer.update_daily_time(self.timer.pomodoro_time)
-        except Exception as e:
-            print(f"Error updating history: {e}")
-            messagebox.showerror("Error", "Failed to update history")
-
     def open_settings(self):
-        chime.info()
+        self.play_chime("info")
         settings_window = tk.Toplevel(self.master)
         settings_window.title("Settings")
-        settings_window.geometry("400x600")
+        settings_window.geometry("400x860")
 
         settings_frame = ttk.Frame(settings_window, padding="20")
         settings_frame.pack(fill="both", expand=True)
@@ -790,6 +3124,40 @@ class PomodoroTimerGUI:
         rain_sound_path_entry.insert(0, self.timer.rain_sound_path)
         rain_sound_path_entry.pack(pady=5)
 
+        ttk.Label(settings_frame, text="Generated Sound (used without a file):").pack(pady=5)
+        noise_colour_var = tk.StringVar(value=self.timer.noise_colour)
+        ttk.Combobox(
+            settings_frame,
+            textvariable=noise_colour_var,
+            values=NoiseGenerator.COLOURS,
+            state="readonly"
+        ).pack(pady=5)
+
+        ttk.Label(settings_frame, text="Generated Sound Intensity:").pack(pady=5)
+        noise_intensity_var = tk.DoubleVar(value=self.timer.noise_intensity * 100)
+        ttk.Scale(settings_frame, from_=0, to=100, variable=noise_intensity_var).pack(pady=2, fill="x")
+
+        ttk.Label(settings_frame, text="Master Volume (ambient tracks and chimes):").pack(pady=5)
+        master_volume_var = tk.DoubleVar(value=self.timer.sound_volume * 100)
+        # Applied while dragging so the change can be heard straight away
+        ttk.Scale(settings_frame, from_=0, to=100, variable=master_volume_var,
+                  command=self.change_volume).pack(pady=2, fill="x")
+
+        ttk.Label(settings_frame, text="Ambient Mix (volume, and file or noise colour):").pack(pady=5)
+        track_volume_vars = {}
+        track_source_entries = {}
+        for name in AmbientMixer.TRACKS:
+            row = ttk.Frame(settings_frame)
+            row.pack(fill="x", pady=2)
+            ttk.Label(row, text=name.title(), width=6).pack(side="left")
+            track_volume_vars[name] = tk.DoubleVar(value=self.timer.track_volumes.get(name, 0) * 100)
+            ttk.Scale(row, from_=0, to=100, variable=track_volume_vars[name]).pack(side="left", fill="x", expand=True)
+            if name != "rain":
+                entry = ttk.Entry(row, width=14)
+                entry.insert(0, self.timer.track_sources.get(name, ""))
+                entry.pack(side="left", padx=5)
+                track_source_entries[name] = entry
+
         button_frame = ttk.Frame(settings_frame)
         button_frame.pack(pady=20, fill="x")
 
@@ -823,22 +3191,12 @@ class PomodoroTimerGUI:
                 old_mega_goal = self.timer.mega_goal
                 new_mega_goal = int(mega_goal_entry.get()) * 3600
                 if new_mega_goal != self.timer.mega_goal:
-                    today = datetime.date.today()
-                    if self.timer.historical_data:
-                        last_entry = self.timer.historical_data[-1]
-                        if last_entry[0] == today:
-                            self.timer.historical_data[-1] = (
-                                today,
-                                last_entry[1],
-                                last_entry[2],
-                                new_mega_goal
-                            )
-                        else:
-                            self.timer.historical_data.append((today, 0, 0, new_mega_goal))
-                    else:
-                        self.timer.historical_data.append((today, 0, 0, new_mega_goal))
+                    today = self.timer.clock.today()
+                    _, count, total_time, _ = self.timer.historical_data.get(today) or (today, 0, 0, 0)
+                    self.timer.historical_data.upsert(today, count, total_time, new_mega_goal)
                     self.timer.mega_goal = new_mega_goal
-                    self.timer.save_historical_data()
+                    self.timer.record_goal_change()
+                    self.refresh_history_view()
                 
                 self.timer.auto_switch = auto_switch_var.get()
                 # Update our GUI's variable to match
@@ -847,90 +3205,66 @@ class PomodoroTimerGUI:
                 # Update rain sound path and test it
                 new_path = rain_sound_path_entry.get().strip()
                 if new_path and not os.path.exists(new_path):
-                    messagebox.showwarning("Warning", "Rain sound file not found. Path will be saved but sound won't work.")
+                    messagebox.showwarning("Warning", "Rain sound file not found. Generated rain will play until the file exists.")
                 
                 # Save the path even if file doesn't exist - user might fix it later
                 self.timer.rain_sound_path = new_path
+                if new_path != self.rain_sound and self.mixer is not None:
+                    self.mixer.cache.clear()  # Drop the old decoded buffers
                 self.rain_sound = new_path  # Update current instance path
+
+                sound = (noise_colour_var.get(), round(noise_intensity_var.get() / 100, 2),
+                         {name: round(var.get() / 100, 2) for name, var in track_volume_vars.items()},
+                         {name: entry.get().strip() for name, entry in track_source_entries.items()})
+                if sound != (self.timer.noise_colour, self.timer.noise_intensity,
+                             self.timer.track_volumes, self.timer.track_sources):
+                    (self.timer.noise_colour, self.timer.noise_intensity,
+                     self.timer.track_volumes, self.timer.track_sources) = sound
+                    if self.is_playing:
+                        # Restart the mix with the new tracks and volumes
+                        self.stop_rain_sound()
+                        self.play_rain_sound()
                 
                 self.timer.save_settings()
                 self.reset_timer()
+                self.update_session_display()  # The goal sets the number of sessions
                 
                 if close_window:
                     settings_window.destroy()
                     
             except ValueError:
-                chime.error()
+                self.play_chime("error")
                 messagebox.showerror(
                     "Invalid Input",
                     "Please enter valid numbers for all durations."
                 )
 
     def update_total_time_label(self):
-        """Enhanced total time label update"""
-        if not self.master.winfo_exists():
-            return
-
-        try:
-            total_seconds = self.timer.total_pomodoro_time
-            formatted_time = time.strftime("%H:%M:%S", time.gmtime(total_seconds))
-            self.total_time_label.config(text=f"Total Time: {formatted_time}")
-            self.timer.save_state()
-        except tk.TclError:
-            pass
+        """Redraw the total time and pomodoro count on the next render"""
+        self.request_render("totals")
 
     def open_history(self):
-        chime.info()  # Audio feedback for opening history
+        self.play_chime("info")  # Audio feedback for opening history
         if not self.timer.historical_data:
-            chime.warning()  # Audio feedback for no history
+            self.play_chime("warning")  # Audio feedback for no history
             messagebox.showinfo("History", "No history data available")
             return
 
-        history_window = tk.Toplevel(self.master)
-        history_window.title("Pomodoro History")
-        history_window.geometry("800x800")
-
-        plt.style.use("dark_background")
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
-        fig.patch.set_facecolor("#2b2b2b")
-
-        data = list(self.timer.historical_data)[-30:]
-        dates = [item[0] for item in data]
-        counts = [item[1] for item in data]
-        total_times = [item[2] / 3600 for item in data]
-        mega_goals = [item[3] / 3600 for item in data]
+        if self.history_view is not None:
+            self.history_view.window.deiconify()
+            self.history_view.window.lift()
+            return
+        self.history_view = HistoryView(
+            self.master, self.timer.historical_data, self.timer.clock, on_close=self._on_history_closed
+        )
 
-        ax1.plot(dates, counts, color="#1e90ff", marker='o', label="Daily Pomodoros", linewidth=2)
-        ax1.set_ylabel("Pomodoros", color="#1e90ff")
-        ax1.grid(True, alpha=0.3)
-        
-        ax2.plot(dates, total_times, color="lime", marker='s', label="Hours Worked", linewidth=2)
-        ax2.plot(dates, mega_goals, color='red', linestyle='--', label='Daily Goals')
-        ax2.set_ylabel("Hours", color="lime")
-        ax2.grid(True, alpha=0.3)
-
-        for ax in [ax1, ax2]:
-            ax.set_facecolor("#2b2b2b")
-            ax.tick_params(colors='white')
-            plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
-            ax.legend(loc='upper left')
-
-        stats_text = (f"Total Pomodoros: {sum(counts)}\n"
-                      f"Total Hours: {sum(total_times):.1f}\n"
-                      f"Daily Average: {sum(total_times)/len(dates):.1f} hours")
-
-        fig.text(0.05, 0.02, stats_text,
-                color='white',
-                fontsize=10,
-                bbox=dict(facecolor='#2b2b2b',
-                         edgecolor='white',
-                         alpha=0.7,
-                         pad=10))
+    def _on_history_closed(self):
+        self.history_view = None
 
-        plt.tight_layout(rect=[0, 0.1, 1, 0.95])
-        canvas = FigureCanvasTkAgg(fig, master=history_window)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    def refresh_history_view(self):
+        """Push the latest rows into the open History window, if any"""
+        if self.history_view is not None:
+            safe_operation(self.history_view.update, "Error updating history view")
 
     @staticmethod
     def format_time(seconds):
@@ -945,16 +3279,20 @@ class PomodoroTimerGUI:
     def on_closing(self):
         """Enhanced cleanup on application exit"""
         try:
-            self.timer.save_state()
-            self.is_running = False
-            self.should_stop.set()
+            self.engine.shutdown()
+            self._cancel_title_timer()
+            self.notifier.close()
+            if not self.hooks.close(timeout=2.0):
+                print("Timed out waiting for hooks")
+            if self.control_server:
+                self.control_server.close()
+            self.timer.compact()
+            if not self.timer.writer.close():
+                print("Timed out flushing pending writes")
             
             if self.is_playing:
                 self.stop_rain_sound()
             
-            if self.timer_thread and self.timer_thread.is_alive():
-                self.timer_thread.join(timeout=1)
-            
             if self.pygame_initialized:
                 try:
                     self.pygame.mixer.quit()
@@ -980,16 +3318,414 @@ class PomodoroTimerGUI:
 
     def check_date(self):
         """Check if it's a new day and reset if needed"""
-        today = datetime.date.today()
-        if today != self.timer.today:
-            self.timer.today = today
-            self.timer._init_new_day()
-            self.update_display()
+        if self.timer.check_new_day():
+            self.request_render("time", "totals", "sessions")
 
 
 # Add this at the bottom of the file, after all classes
+def print_startup_profile(marks):
+    """Print the time spent in each startup phase and in lazily imported modules"""
+    print("Startup profile (ms):")
+    previous = _startup_started
+    for label, stamp in marks:
+        print(f"  {label:<24}{(stamp - previous) * 1000:8.1f}")
+        previous = stamp
+    print(f"  {'time to first frame':<24}{(previous - _startup_started) * 1000:8.1f}")
+    for name in ("ttkbootstrap", "chime", "matplotlib.pyplot", "matplotlib.backends.backend_tkagg", "pygame"):
+        load_time = LazyModule.load_times.get(name)
+        shown = f"{load_time * 1000:8.1f}" if load_time is not None else "  (lazy)"
+        print(f"  import {name:<17}{shown}")
+
+
+def print_stats(as_json=False):
+    """Print history analytics for the data in the current directory.
+
+    Read-only, so it is safe while a window or daemon owns the directory.
+    """
+    timer = PomodoroTimer(read_only=True)
+    try:
+        stats = timer.cached_summary() or HistoryAnalytics(timer.historical_data, clock=timer.clock).summary()
+        if timer.history_backend == "sqlite":
+            stats["sessions"] = timer.historical_data.session_counts()
+    finally:
+        timer.writer.close()
+    if as_json:
+        print(json.dumps(stats, indent=2))
+        return
+    rolling = ", ".join(f"{days}d {hours:.1f}h" for days, hours in stats["rolling_average_hours"].items())
+    percentiles = ", ".join(f"p{p} {hours:.1f}h" for p, hours in stats["hours_percentiles"].items())
+    weekdays = ", ".join(f"{name} {hours:.1f}h" for name, hours in
+                         zip(("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"), stats["weekday_hours"]))
+    print(f"Days recorded:   {stats['days_recorded']}")
+    print(f"Total:           {stats['total_pomodoros']} pomodoros, {stats['total_hours']:.1f} hours")
+    print(f"Rolling average: {rolling}")
+    print(f"Streak:          {stats['current_streak']} days (best {stats['longest_streak']})")
+    print(f"Goal hit:        {stats['goal_hit_ratio']:.0%} of days")
+    print(f"Active days:     {percentiles}")
+    print(f"By weekday:      {weekdays}")
+    for mode, counts in sorted(stats.get("sessions", {}).items()):
+        print(f"{mode + ':':<17}{counts['completed']} completed, {counts['interrupted']} interrupted")
+
+
+def run_daemon(args):
+    """Run pomodoro cycles without Tk, persisting through the usual settings and state files"""
+    timer = PomodoroTimer()
+    timer.preload_history()
+    scheduler = LoopScheduler()
+    engine = TimerEngine(timer, scheduler, tick_wakeups=False)  # Socket watchers hold ticks while connected
+    first_count = timer.pomodoro_count
+
+    def on_mode(mode):
+        print(f"{mode} started ({PomodoroTimerGUI.format_time(timer.current_time)})", flush=True)
+
+    def on_complete(finished_mode, next_mode, history_saved):
+        print(f"{finished_mode} complete, next: {next_mode}", flush=True)
+        if args.cycles and finished_mode == "Pomodoro" and timer.pomodoro_count - first_count >= args.cycles:
+            scheduler.stop()
+
+    engine.subscribe("mode", on_mode)
+    engine.subscribe("complete", on_complete)
+    hooks = HookRunner(timer.hooks + [{"event": "complete", "shell": command} for command in args.on_complete])
+    hooks.attach(engine)
+    control_server = start_control_server(engine, timer)
+    if control_server:
+        control_server.hooks = hooks
+    if args.mode:
+        engine.set_mode(args.mode)  # Announced through on_mode
+    else:
+        on_mode(timer.mode)
+    engine.start()
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.shutdown()
+        if control_server:
+            control_server.close()
+        if not hooks.close():
+            print("Timed out waiting for hooks", flush=True)
+        timer.compact()
+        timer.writer.close()
+
+
+def simulate_days(days, start=None):
+    """Fast-forward `days` working days on a virtual clock and return a summary.
+
+    Each simulated day starts at 09:00 and runs auto-switching cycles until the
+    daily goal is met, going through the real engine, session counting, journal
+    and history writes. Runs in a scratch directory with default settings.
+    """
+    start = start or datetime.datetime.combine(datetime.date.today(), datetime.time(9))
+    clock = VirtualClock(start)
+    original_dir = os.getcwd()
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            timer = PomodoroTimer(clock=clock)
+            timer.auto_switch = True
+            scheduler = LoopScheduler(clock)
+            engine = TimerEngine(timer, scheduler, tick_wakeups=False)
+            phases = {"Pomodoro": 0, "Short Break": 0, "Long Break": 0}
+
+            def on_complete(finished_mode, next_mode, history_saved):
+                phases[finished_mode] += 1
+                if finished_mode == "Pomodoro" and timer._daily_time >= timer.mega_goal:
+                    scheduler.stop()
+
+            engine.subscribe("complete", on_complete)
+            for day in range(days):
+                clock.advance_to(start + datetime.timedelta(days=day))
+                engine.switch_mode("Pomodoro")
+                scheduler.run()
+                engine.shutdown()
+            timer.compact()
+            timer.writer.close()
+            summary = HistoryAnalytics(timer.historical_data, clock=clock).summary(days)
+            history_days = len(timer.historical_data)
+        finally:
+            os.chdir(original_dir)
+    elapsed = time.perf_counter() - started
+    return {
+        "days": days,
+        "phases": phases,
+        "history_days": history_days,
+        "simulated_hours": clock.monotonic() / 3600,
+        "real_ms": elapsed * 1000,
+        "summary": summary,
+    }
+
+
+SOAK_BUDGETS = {"rss_kb": 8.0, "traced_kb": 2.0, "open_fds": 0.01, "threads": 0.01}  # Allowed growth per cycle
+
+
+def sample_resources():
+    """Current RSS, traced Python heap, open file descriptors and live threads"""
+    sample = {"traced_kb": tracemalloc.get_traced_memory()[0] / 1024, "threads": threading.active_count()}
+    try:
+        with open("/proc/self/statm") as statm:
+            sample["rss_kb"] = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024
+        sample["open_fds"] = len(os.listdir("/proc/self/fd"))
+    except OSError:
+        pass  # Not Linux: RSS and fd counts are not sampled
+    return sample
+
+
+def _write_silence(path, seconds=1, rate=22050):
+    """Write a short silent WAV so sound toggles can run without a user sound file"""
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\0\0" * rate * seconds)
+
+
+def soak_test(cycles=1000, sample_every=100, budgets=SOAK_BUDGETS, use_gui=True):
+    """Drive many work/break cycles on a virtual clock and measure resource growth.
+
+    With a display, the real window is driven: every cycle also toggles the
+    ambient sound and opens and closes the History window. Without one, only
+    the timer engine, persistence and analytics run. Growth per cycle is taken
+    between the first sample (after one warm-up interval) and the last.
+    Returns a report dict whose "passed" is False if any budget is exceeded.
+    """
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    clock = VirtualClock(datetime.datetime.combine(datetime.date.today(), datetime.time(9)))
+    scheduler = LoopScheduler(clock)
+    original_dir = os.getcwd()
+    samples = []
+    tracemalloc.start(1)
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        root = gui = None
+        try:
+            _write_silence("soak.wav")
+            with open("settings.json", "w") as f:
+                json.dump({"pomodoro": 25, "short_break": 5, "long_break": 15, "auto_switch": True,
+                           "control_socket": False, "desktop_notifications": False,
+                           "rain_sound_path": "soak.wav"}, f)
+            if use_gui:
+                try:
+                    root = tk.Tk()
+                    root.withdraw()
+                    gui = PomodoroTimerGUI(root, clock=clock, scheduler=scheduler)
+                    gui.audio_warmup.wait(10)  # Sample a ready mixer, not the warm-up
+                    timer, engine = gui.timer, gui.engine
+                except tk.TclError as e:
+                    print(f"No display ({e}); running the engine only")
+                    root = None
+            if gui is None:
+                timer = PomodoroTimer(clock=clock)
+                engine = TimerEngine(timer, scheduler)
+
+            def on_complete(finished_mode, next_mode, history_saved):
+                if finished_mode != "Pomodoro":
+                    scheduler.stop()
+
+            engine.subscribe("complete", on_complete)
+            engine.switch_mode("Pomodoro")
+            first_snapshot = None
+            for cycle in range(1, cycles + 1):
+                scheduler.run()  # One pomodoro and the break after it
+                if gui is not None:
+                    gui.toggle_rain_sound()
+                    gui.toggle_rain_sound()
+                    gui.open_history()
+                    if gui.history_view is not None:
+                        gui.history_view.close()
+                    root.update()
+                else:
+                    HistoryAnalytics(timer.historical_data, clock=clock).summary()
+                if cycle % sample_every == 0:
+                    timer.writer.flush()
+                    if first_snapshot is None:  # Taken before sampling so every sample includes it
+                        first_snapshot = tracemalloc.take_snapshot()
+                    samples.append(dict(sample_resources(), cycle=cycle))
+            last_snapshot = tracemalloc.take_snapshot()
+            engine.shutdown()
+            timer.compact()
+            timer.writer.close()
+        finally:
+            if gui is not None and gui.pygame_initialized:
+                safe_operation(gui.pygame.mixer.quit, "Error closing sound system")
+            if root is not None:
+                root.destroy()
+            os.chdir(original_dir)
+            tracemalloc.stop()
+
+    report = {"cycles": cycles, "mode": "gui" if gui is not None else "engine",
+              "growth_per_cycle": {}, "samples": samples, "top_allocations": [], "passed": True}
+    if len(samples) >= 2:
+        span = samples[-1]["cycle"] - samples[0]["cycle"]
+        for metric, budget in sorted(budgets.items()):
+            if metric in samples[0]:
+                growth = (samples[-1][metric] - samples[0][metric]) / span
+                report["growth_per_cycle"][metric] = {"value": round(growth, 4), "budget": budget}
+                report["passed"] &= growth <= budget
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        changes = last_snapshot.filter_traces(ignore).compare_to(first_snapshot.filter_traces(ignore), "lineno")
+        for stat in changes[:10]:
+            frame = stat.traceback[0]
+            report["top_allocations"].append({
+                "where": f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count_diff": stat.count_diff,
+            })
+    for sample in samples:
+        for metric, value in sample.items():
+            sample[metric] = round(value, 1)
+    return report
+
+
+def print_soak_report(report):
+    print(f"Soak test: {report['cycles']} cycles ({report['mode']})")
+    print(f"  {'cycle':>7} " + " ".join(f"{metric:>10}" for metric in sorted(SOAK_BUDGETS)))
+    for sample in report["samples"]:
+        print(f"  {sample['cycle']:>7} " + " ".join(f"{sample.get(metric, '-'):>10}"
+                                                     for metric in sorted(SOAK_BUDGETS)))
+    print("Growth per cycle (budget):")
+    for metric, result in report["growth_per_cycle"].items():
+        flag = "" if result["value"] <= result["budget"] else "  OVER BUDGET"
+        print(f"  {metric:<10} {result['value']:>10} ({result['budget']}){flag}")
+    print("Largest Python allocation growth:")
+    for entry in report["top_allocations"]:
+        print(f"  {entry['where']:<30} {entry['size_diff_kb']:>8} KiB {entry['count_diff']:>+8} blocks")
+    print("PASS" if report["passed"] else "FAIL")
+
+
+def benchmark_controls(iterations=2000, budget_ms=5.0):
+    """Measure reset, mode-change, switch and pause/resume latency of the engine.
+
+    Runs in a scratch directory so the real state files are untouched; returns
+    False if any p99 exceeds the budget.
+    """
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            timer = PomodoroTimer()
+            engine = TimerEngine(timer, LoopScheduler())
+            engine.start()
+            actions = {
+                "reset": engine.reset,
+                "set-mode": lambda: engine.set_mode("Short Break"),
+                "switch-mode": lambda: engine.switch_mode("Pomodoro"),
+                "pause": lambda: (engine.start(), engine.pause()),
+                "resume": engine.resume,
+            }
+            samples = {name: [] for name in actions}
+            for _ in range(iterations):
+                for name, action in actions.items():
+                    started = time.perf_counter()
+                    action()
+                    samples[name].append((time.perf_counter() - started) * 1000)
+            engine.shutdown()
+            timer.writer.close()
+        finally:
+            os.chdir(original_dir)
+
+    within_budget = True
+    print(f"Control latency over {iterations} runs (ms, budget {budget_ms}):")
+    for name, values in samples.items():
+        values.sort()
+        p50 = values[len(values) // 2]
+        p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+        within_budget &= p99 <= budget_ms
+        print(f"  {name:<12} p50 {p50:7.3f}  p99 {p99:7.3f}  max {values[-1]:7.3f}")
+    return within_budget
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Pomodoro Timer")
+    parser.add_argument("command", nargs="?", default="gui",
+                        choices=["gui", "stats", "daemon", "control", "bench", "simulate", "soak"],
+                        help="gui (default), stats to print history analytics, "
+                             "daemon to run cycles without a window, "
+                             "control to send a command to a running timer, "
+                             "bench to measure control latency, "
+                             "simulate to fast-forward days on a virtual clock, "
+                             "or soak to check for leaks over many cycles")
+    parser.add_argument("control_args", nargs="*", metavar="ARG",
+                        help="control: status, start, pause, reset, set-mode MODE, subscribe "
+                             "or watch [FORMAT]")
+    parser.add_argument("--json", action="store_true", help="stats: print machine-readable JSON")
+    parser.add_argument("--mode", choices=["Pomodoro", "Short Break", "Long Break"],
+                        help="gui, daemon: mode to start in (default: the saved mode)")
+    parser.add_argument("--cycles", type=int, default=0,
+                        help="daemon: stop after this many pomodoros (default: run until stopped); "
+                             "soak: work/break cycles to run (default: 1000)")
+    parser.add_argument("--days", type=int, default=30,
+                        help="simulate: number of working days to fast-forward (default: 30)")
+    parser.add_argument("--report", metavar="PATH",
+                        help="soak: also write the report as JSON to PATH for diffing between releases")
+    parser.add_argument("--on-complete", action="append", default=[], metavar="COMMAND",
+                        help="daemon: shell command to run when a phase ends (repeatable)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print an import and time-to-first-frame breakdown")
+    return parser
+
+
 def main():
+    args = build_parser().parse_args()
+
+    if args.command in ("gui", "daemon"):
+        # The lock is held until exit; a second launch hands its arguments to the first
+        instance_lock = InstanceLock()
+        if not instance_lock.acquire():
+            if args.command == "gui" and activate_running_instance(sys.argv[1:]):
+                return
+            print("Pomodoro Timer is already running in this directory")
+            sys.exit(1)
+
+    if args.command == "stats":
+        print_stats(args.json)
+        return
+    if args.command == "daemon":
+        run_daemon(args)
+        return
+    if args.command == "bench":
+        sys.exit(0 if benchmark_controls() else 1)
+    if args.command == "soak":
+        report = soak_test(cycles=args.cycles or 1000)
+        if args.json:
+            print(json.dumps(report, indent=2, sort_keys=True))
+        else:
+            print_soak_report(report)
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write("\n")
+        sys.exit(0 if report["passed"] else 1)
+    if args.command == "simulate":
+        result = simulate_days(args.days)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print(f"Simulated {result['days']} days ({result['simulated_hours']:.1f} h) "
+                  f"in {result['real_ms']:.1f} ms")
+            print("Phases: " + ", ".join(f"{mode} {count}" for mode, count in result["phases"].items()))
+            print(f"History days written: {result['history_days']}")
+        return
+    if args.command == "control":
+        command = args.control_args[0] if args.control_args else "status"
+        request = {"cmd": command}
+        if command == "set-mode":
+            request["mode"] = " ".join(args.control_args[1:])
+        elif command == "watch" and len(args.control_args) > 1:
+            request["format"] = " ".join(args.control_args[1:])
+        try:
+            send_control_command(request, follow=command in ("subscribe", "watch"))
+        except (OSError, KeyboardInterrupt) as e:
+            if isinstance(e, OSError):
+                print(f"No running timer: {e}")
+        return
+
+    marks = [("module imports", _startup_imports_done)]
     root = tk.Tk()
+    marks.append(("Tk init", time.perf_counter()))
     try:
         icon_image = tk.PhotoImage(file="assets/time-organization.png")
         root.iconphoto(False, icon_image)
@@ -997,6 +3733,15 @@ def main():
         pass  # Skip if icon not found
     
     app = PomodoroTimerGUI(root)
+    if args.mode:
+        app.engine.set_mode(args.mode)
+    marks.append(("state + widgets", time.perf_counter()))
+    if args.profile_startup:
+        def report_first_frame():
+            root.update_idletasks()
+            marks.append(("first frame", time.perf_counter()))
+            print_startup_profile(marks)
+        root.after_idle(report_first_frame)
     try:
         root.mainloop()
     except Exception as e:
@@ -1005,4 +3750,4 @@ def main():
         os._exit(0)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,48 @@
+"""Shared fixtures: app-v3.py loaded as a module, and a scratch data directory per test"""
+import datetime
+import importlib.util
+import json
+import pathlib
+
+import pytest
+
+APP_PATH = pathlib.Path(__file__).resolve().parent.parent / "app-v3.py"
+
+
+@pytest.fixture(scope="session")
+def app():
+    # The file name has a dash, so it is loaded by path rather than imported
+    spec = importlib.util.spec_from_file_location("pomodoro_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Every state, journal and history file is resolved against the working directory"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def clock(app):
+    return app.VirtualClock(datetime.datetime(2025, 3, 3, 9, 0))  # A Monday
+
+
+@pytest.fixture
+def make_timer(app, clock):
+    """Build PomodoroTimers on the virtual clock, optionally writing settings.json first"""
+    timers = []
+
+    def make(**settings):
+        if settings:
+            with open("settings.json", "w") as f:
+                json.dump(settings, f)
+        timer = app.PomodoroTimer(clock=clock)
+        timers.append(timer)
+        return timer
+
+    yield make
+    for timer in timers:
+        timer.writer.close()
@@ -0,0 +1,75 @@
+import datetime
+from array import array
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+MONDAY = datetime.date(2025, 3, 3)
+
+
+def records(*rows):
+    """Flat history records from (day offset from MONDAY, count, hours, goal hours) rows"""
+    flat = array("I")
+    for offset, count, hours, goal in rows:
+        flat.extend(((MONDAY + datetime.timedelta(days=offset)).toordinal(), count,
+                     int(hours * 3600), int(goal * 3600)))
+    return flat
+
+
+def day(offset):
+    return MONDAY + datetime.timedelta(days=offset)
+
+
+def test_streaks_count_calendar_days_and_gaps(app):
+    history = records((0, 4, 2, 4), (1, 4, 2, 4), (2, 4, 2, 4), (4, 4, 2, 4), (5, 4, 2, 4))
+    assert app.HistoryAnalytics(history, today=day(5)).streaks() == (2, 3)
+
+
+def test_current_streak_survives_until_the_day_after(app):
+    history = records((0, 1, 1, 4), (1, 1, 1, 4))
+    assert app.HistoryAnalytics(history, today=day(2)).streaks() == (2, 2)
+    assert app.HistoryAnalytics(history, today=day(3)).streaks() == (0, 2)
+
+
+def test_rolling_average_treats_missing_days_as_zero(app):
+    history = records((0, 2, 7, 4), (6, 2, 7, 4))
+    analytics = app.HistoryAnalytics(history, today=day(6))
+    assert analytics.rolling_average_hours(7)[analytics.today_index] == pytest.approx(2.0)
+    assert analytics.rolling_average_hours(7)[0] == pytest.approx(7.0)  # Shorter window at the start
+
+
+def test_window_totals_and_goal_hit_ratio(app):
+    history = records((0, 8, 4, 4), (1, 2, 1, 4), (2, 9, 5, 4), (3, 1, 0.5, 4))
+    analytics = app.HistoryAnalytics(history, today=day(3))
+    assert analytics.window_totals(2) == (10, pytest.approx(5.5))
+    assert analytics.goal_hit_ratio() == pytest.approx(0.5)
+
+
+def test_weekday_hours_averages_each_weekday(app):
+    history = records((0, 2, 3, 4), (7, 2, 1, 4))  # Two Mondays
+    analytics = app.HistoryAnalytics(history, today=day(7))
+    weekdays = analytics.weekday_hours()
+    assert weekdays[0] == pytest.approx(2.0)
+    assert weekdays[1:].sum() == 0
+
+
+def test_calendar_heatmap_ends_with_the_current_week(app):
+    history = records((0, 2, 3, 4), (9, 2, 1.5, 4))  # Monday, then the next week's Wednesday
+    grid = app.HistoryAnalytics(history, today=day(9)).calendar_heatmap(weeks=2)
+    assert grid.shape == (2, 7)
+    assert grid[0, 0] == pytest.approx(3.0)
+    assert grid[1, 2] == pytest.approx(1.5)
+
+
+def test_summary_of_empty_history(app, clock):
+    summary = app.HistoryAnalytics(array("I"), clock=clock).summary()
+    assert summary["days_recorded"] == 0
+    assert summary["current_streak"] == 0
+    assert summary["hours_percentiles"] == {50: 0.0, 75: 0.0, 90: 0.0, 95: 0.0}
+
+
+def test_today_comes_from_the_clock(app, clock):
+    history = records((0, 1, 1, 4))
+    clock.advance(3 * 86400)
+    assert app.HistoryAnalytics(history, clock=clock).today_index == 3
@@ -0,0 +1,52 @@
+import json
+import socket
+
+import pytest
+
+
+@pytest.fixture
+def control(app, clock, make_timer, data_dir):
+    """A ControlServer on the virtual clock with one connected client; returns (server, engine, peer)"""
+    timer = make_timer(pomodoro=1)
+    scheduler = app.LoopScheduler(clock)
+    engine = app.TimerEngine(timer, scheduler, tick_wakeups=False)
+    server = app.ControlServer(engine, scheduler, path=str(data_dir / "control.sock"))
+    client, peer = socket.socketpair()
+    server._clients[client] = b""
+    peer.settimeout(1)
+    yield server, engine, client, peer
+    client.close()
+    peer.close()
+
+
+def read_lines(peer, count):
+    data = b""
+    while data.count(b"\n") < count:
+        data += peer.recv(4096)
+    return [json.loads(line) for line in data.splitlines()[:count]]
+
+
+def test_subscribe_is_acknowledged_before_the_first_tick(control, clock):
+    server, engine, client, peer = control
+    engine.start()
+    clock.advance(5)
+    assert server.handle(b'{"cmd": "subscribe"}', client) is None
+    ack, tick = read_lines(peer, 2)
+    assert ack["ok"] is True
+    assert tick["event"] == "tick" and tick["status"]["remaining"] == 55
+    assert engine.ticking
+
+
+def test_metrics_report_the_persistence_writer(control):
+    server, engine, client, peer = control
+    metrics = server.handle(b'{"cmd": "metrics"}', client)["metrics"]
+    assert metrics["writer"]["queue_depth"] >= 0
+    assert "max_latency_ms" in metrics["writer"]
+
+
+
+def test_watch_rejects_a_bad_format(control):
+    server, engine, client, peer = control
+    response = server.handle(b'{"cmd": "watch", "format": "{nope}"}', client)
+    assert response["ok"] is False
+    assert client not in server._watchers
@@ -0,0 +1,89 @@
+import pytest
+
+
+@pytest.fixture
+def run(app, clock, make_timer):
+    """An engine on the virtual clock with one-minute phases; returns (timer, engine, scheduler, events)"""
+    def build(tick_wakeups=True):
+        timer = make_timer(pomodoro=1, short_break=1, long_break=1)
+        scheduler = app.LoopScheduler(clock)
+        engine = app.TimerEngine(timer, scheduler, tick_wakeups=tick_wakeups)
+        events = []
+        for event in ("start", "pause", "resume", "reset", "tick", "complete", "mode"):
+            engine.subscribe(event, lambda *args, event=event: events.append((event,) + args))
+        engine.subscribe("complete", lambda *args: scheduler.stop())
+        return timer, engine, scheduler, events
+    return build
+
+
+def test_phase_completes_on_its_deadline(run, clock):
+    timer, engine, scheduler, events = run()
+    engine.start()
+    scheduler.run()
+    assert clock.monotonic() == 60
+    assert ("complete", "Pomodoro", "Short Break", True) in events
+    assert sum(event[0] == "tick" for event in events) == 60
+    assert timer.pomodoro_count == 1
+    assert timer.historical_data.get(clock.today())[1:3] == (1, 60)
+
+
+def test_without_tick_wakeups_only_the_deadline_wakes(run):
+    timer, engine, scheduler, events = run(tick_wakeups=False)
+    engine.start()
+    scheduler.run()
+    assert scheduler.meter.wakeups == 1
+    assert timer.current_time == 0
+
+
+def test_pause_keeps_the_sub_second_remainder(run, clock):
+    timer, engine, scheduler, events = run(tick_wakeups=False)
+    engine.start()
+    scheduler.call_later(10.5, engine.pause)
+    scheduler.run()  # Returns once paused: nothing is scheduled
+    assert engine.is_paused and timer.current_time == 50
+    clock.advance(300)
+    engine.resume()
+    scheduler.run()
+    assert clock.monotonic() == pytest.approx(360)
+    assert timer.pomodoro_count == 1
+
+
+def test_holding_ticks_catches_up_at_once(run):
+    timer, engine, scheduler, events = run(tick_wakeups=False)
+    engine.start()
+    scheduler.call_later(30.2, lambda: (engine.want_ticks("window"), scheduler.stop()))
+    scheduler.run()
+    assert engine.ticking
+    assert timer.current_time == 30
+    engine.want_ticks("window", False)
+    assert not engine.ticking
+
+
+def test_set_mode_resets_and_announces_the_mode(run):
+    timer, engine, scheduler, events = run()
+    engine.start()
+    engine.set_mode("Long Break")
+    assert not engine.is_running
+    assert timer.current_time == timer.long_break_time
+    assert events[-2:] == [("reset",), ("mode", "Long Break")]
+
+
+def test_auto_switch_starts_the_next_phase(run, clock):
+    timer, engine, scheduler, events = run()
+    engine.start()
+    scheduler.run()
+    scheduler.run()  # The engine's own pending switch starts the break; stops when it completes
+    assert ("mode", "Short Break") in events
+    assert [event[1] for event in events if event[0] == "complete"] == ["Pomodoro", "Short Break"]
+    assert clock.monotonic() == pytest.approx(120 + engine.SWITCH_DELAY)
+
+
+def test_wakeup_meter_memory_is_fixed_on_a_virtual_clock(app, clock):
+    meter = app.WakeupMeter(clock)
+    for _ in range(10000):
+        clock.advance(0.5)
+        meter.count()
+    assert len(meter._counts) == meter.WINDOW
+    assert meter.per_second() == pytest.approx(2.0, abs=1 / meter.WINDOW)  # The current second is partial
+    clock.advance(meter.WINDOW)
+    assert meter.per_second() == 0
@@ -0,0 +1,79 @@
+import datetime
+import json
+import os
+import sqlite3
+
+ROWS = [(datetime.date(2025, 1, 2), 3, 4500, 14400), (datetime.date(2025, 1, 3), 2, 3000, 14400)]
+
+
+def test_legacy_json_migrates_and_skips_malformed_rows(make_timer):
+    with open("pomodoro_history.json", "w") as f:
+        json.dump([["2025-01-02", 3, 4500, 14400], ["bad", 1, 2], [1, 2], ["2025-01-03", 2, 3000]], f)
+    timer = make_timer()
+    assert list(timer.historical_data) == ROWS
+    timer.writer.flush()
+    assert os.path.exists("pomodoro_history.json.bak")
+    assert not os.path.exists("pomodoro_history.json")
+
+    assert list(make_timer().historical_data) == ROWS  # Read back from pomodoro_history.bin
+
+
+def test_binary_history_moves_to_sqlite_losslessly(app, make_timer):
+    writer = app.PersistenceWriter()
+    app.HistoryStore(writer).replace_all(ROWS)
+    writer.close()
+
+    timer = make_timer(history_backend="sqlite")
+    assert list(timer.historical_data) == ROWS
+    timer.compact()
+    timer.writer.flush()
+    with sqlite3.connect("pomodoro_history.db") as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert connection.execute("SELECT day, count, seconds, goal FROM daily ORDER BY day").fetchall() == [
+            (day.toordinal(), count, seconds, goal) for day, count, seconds, goal in ROWS]
+
+
+def test_sqlite_records_sessions_with_the_rollup(app, clock, make_timer):
+    timer = make_timer(history_backend="sqlite")
+    now = clock.time()
+    timer.complete_pomodoro((now - 1500, now, "Pomodoro", False))
+    timer.record_session((now, now + 60, "Short Break", True))
+    assert timer.historical_data.session_counts() == {
+        "Pomodoro": {"completed": 1, "interrupted": 0},
+        "Short Break": {"completed": 0, "interrupted": 1},
+    }
+
+
+def test_today_is_patched_in_place(app, data_dir):
+    writer = app.PersistenceWriter()
+    store = app.HistoryStore(writer)
+    today = datetime.date(2025, 3, 3)
+    for count in range(1, 4):
+        store.upsert(today, count, count * 1500, 14400)
+    writer.close()
+    assert os.path.getsize("pomodoro_history.bin") == len(store.MAGIC) + store.RECORD.size
+    assert list(app.HistoryStore(app.PersistenceWriter()).raw_records()) == [today.toordinal(), 3, 4500, 14400]
+
+
+def test_in_memory_store_never_writes(app, data_dir):
+    writer = app.PersistenceWriter()
+    store = app.HistoryStore(writer, path=None)
+    store.upsert(datetime.date(2025, 3, 3), 1, 1500, 14400)
+    store.replace_all(ROWS)
+    writer.close()
+    assert len(store) == 2
+    assert os.listdir(data_dir) == []
+
+
+def test_sqlite_reads_do_not_write_the_database(app, data_dir):
+    with sqlite3.connect("pomodoro_history.db") as connection:  # Rollback journal, not WAL
+        connection.executescript(app.SqliteHistoryStore.SCHEMA)
+        connection.execute(app.SqliteHistoryStore.UPSERT_DAY, (ROWS[0][0].toordinal(),) + ROWS[0][1:])
+    connection.close()
+    database = data_dir / "pomodoro_history.db"
+    before = database.read_bytes()
+
+    store = app.SqliteHistoryStore(app.PersistenceWriter(read_only=True))
+    assert list(store) == ROWS[:1]
+    assert store.session_counts() == {}
+    assert database.read_bytes() == before
@@ -0,0 +1,71 @@
+import os
+import json
+
+
+def complete_pomodoro(app, clock, timer):
+    scheduler = app.LoopScheduler(clock)
+    engine = app.TimerEngine(timer, scheduler, tick_wakeups=False)
+    engine.subscribe("complete", lambda *args: scheduler.stop())
+    engine.start()
+    scheduler.run()
+    timer.writer.flush()
+
+
+def test_uncompacted_events_are_replayed(app, clock, make_timer):
+    timer = make_timer(pomodoro=1)
+    complete_pomodoro(app, clock, timer)
+    assert not os.path.exists("session_state.json")  # Only the journal has the pomodoro
+
+    restarted = make_timer()
+    assert restarted.pomodoro_count == 1
+    assert restarted._daily_time == 60
+    assert restarted.historical_data.get(clock.today())[1:3] == (1, 60)
+
+
+def test_torn_trailing_line_is_ignored(app, clock, make_timer, data_dir):
+    timer = make_timer(pomodoro=1)
+    complete_pomodoro(app, clock, timer)
+    with open("pomodoro_journal.jsonl", "a") as f:
+        f.write('{"event": "pomodoro", "pomodoro_co')
+
+    restarted = make_timer()
+    assert restarted.pomodoro_count == 1
+
+
+def test_replaying_an_event_twice_is_harmless(app, clock, make_timer):
+    timer = make_timer(pomodoro=1)
+    complete_pomodoro(app, clock, timer)
+    with open("pomodoro_journal.jsonl") as f:
+        pomodoro = next(line for line in f if json.loads(line)["event"] == "pomodoro")
+    with open("pomodoro_journal.jsonl", "a") as f:
+        f.write(pomodoro)
+
+    restarted = make_timer()
+    assert restarted.pomodoro_count == 1
+    assert restarted.historical_data.get(clock.today())[1] == 1
+
+
+def test_compaction_folds_the_journal_into_the_snapshots(app, clock, make_timer):
+    timer = make_timer(pomodoro=1)
+    complete_pomodoro(app, clock, timer)
+    timer.compact()
+    timer.writer.flush()
+    with open("pomodoro_journal.jsonl") as f:
+        assert f.read() == ""
+
+    restarted = make_timer()
+    assert restarted.pomodoro_count == 1
+    assert restarted._load_snapshot() is not None
+
+
+def test_stats_leaves_the_directory_untouched(app, clock, make_timer, data_dir, capsys):
+    timer = make_timer(pomodoro=1)
+    complete_pomodoro(app, clock, timer)
+    with open("pomodoro_history.json", "w") as f:
+        json.dump([["2025-01-02", 3, 4500, 14400]], f)
+    os.remove("pomodoro_history.bin")
+    before = {path.name: path.stat().st_mtime_ns for path in data_dir.iterdir()}
+
+    app.print_stats(as_json=True)
+    assert json.loads(capsys.readouterr().out)["total_pomodoros"] == 4
+    assert {path.name: path.stat().st_mtime_ns for path in data_dir.iterdir()} == before
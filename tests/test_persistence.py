@@ -0,0 +1,62 @@
+import threading
+
+
+def blocked_writer(app):
+    """A writer whose thread is held until the returned event is set, so operations queue up"""
+    writer = app.PersistenceWriter()
+    release = threading.Event()
+    writer.call("gate", release.wait)
+    return writer, release
+
+
+def test_replace_keeps_its_place_in_the_queue(app, data_dir):
+    writer, release = blocked_writer(app)
+    order = []
+
+    def content(name, text):
+        return lambda: order.append(name) or text
+
+    writer.replace("history", content("history A", "A"))
+    writer.replace("journal", content("journal", ""))
+    writer.replace("history", content("history B", "B"))
+    release.set()
+    writer.close()
+    assert order == ["history B", "journal"]
+    assert (data_dir / "history").read_text() == "B"
+    assert writer.coalesced == 1
+
+
+def test_replace_after_an_append_is_queued_behind_it(app, data_dir):
+    writer, release = blocked_writer(app)
+    writer.replace("journal", "")
+    writer.append("journal", "one\n")
+    writer.append("journal", "two\n")
+    writer.replace("journal", "")
+    writer.append("journal", "three\n")
+    release.set()
+    writer.close()
+    assert (data_dir / "journal").read_text() == "three\n"
+    assert writer.writes == 5  # Gate, reset, both appends at once, reset, append
+
+
+def test_a_failing_call_does_not_skip_merged_calls(app, data_dir):
+    writer, release = blocked_writer(app)
+    ran = []
+
+    def fail():
+        raise RuntimeError("database is locked")
+
+    writer.call("history", fail)
+    writer.call("history", lambda: ran.append("second"))
+    release.set()
+    writer.close()
+    assert ran == ["second"]
+    assert writer.errors == 1
+
+
+def test_read_only_writer_drops_everything(app, data_dir):
+    writer = app.PersistenceWriter(read_only=True)
+    writer.replace("settings.json", "{}")
+    writer.append("journal", "line\n")
+    writer.close()
+    assert list(data_dir.iterdir()) == []